@@ -0,0 +1,222 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import contact_manager as ctdb
+from contact_columns import ColumnarContactsDB
+from contact_dedup import keep_first
+from contact_index import IndexedContactsDB
+
+BACKENDS = {
+    'dict': dict,
+    'indexed': IndexedContactsDB,
+    'columnar': ColumnarContactsDB,
+}
+OPERATIONS = ['add', 'search_name', 'search_category', 'find_phone', 'update', 'merge', 'save', 'load']
+
+FIRST_NAMES = ['James', 'Mary', 'John', 'Patricia', 'Robert', 'Jennifer', 'Michael', 'Linda', 'David', 'Elizabeth',
+               'William', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah', 'Devean', 'Karen']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez',
+              'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson', 'Thomas', 'Taylor', 'Moore', 'Cordes', 'Martin']
+CITIES = [('Anytown', 'CA'), ('Springfield', 'IL'), ('Riverside', 'TX'), ('Fairview', 'NY'), ('Madison', 'WI')]
+CATEGORIES = ['personal', 'work', 'family', '']
+
+
+def generate_contacts(count: int, seed: int = 0):
+    """
+    Yield count synthetic contacts, the same ones for the same seed.
+    Names get a number so searches match a realistic fraction of the book.
+    """
+    rng = random.Random(seed)
+    for i in range(count):
+        first_name = rng.choice(FIRST_NAMES) + str(rng.randint(0, 999))
+        last_name = rng.choice(LAST_NAMES)
+        city, state = rng.choice(CITIES)
+        yield {
+            'first_name': first_name,
+            'last_name': last_name,
+            'phone': f'{i // 10000000 % 1000:03d}-{i // 10000 % 1000:03d}-{i % 10000:04d}', # unique per contact
+            'email': f'{first_name.lower()}.{last_name.lower()}@email.com',
+            'address': {'street': f'{rng.randint(1, 9999)} Main St', 'city': city, 'state': state, 'zip_code': f'{rng.randint(10000, 99999)}'},
+            'category': rng.choice(CATEGORIES),
+            'notes': '',
+            'created_date': '2025-01-01',
+            'last_modified': '2025-01-01',
+        }
+
+
+def timed(function, trace_memory: bool) -> tuple:
+    """
+    Returns:
+        tuple: (result, seconds, peak traced memory in MB or None)
+    """
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = function()
+    seconds = time.perf_counter() - start
+    peak_mb = None
+    if trace_memory:
+        peak_mb = round(tracemalloc.get_traced_memory()[1] / 2**20, 3)
+        tracemalloc.stop()
+    return result, seconds, peak_mb
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError: # not on windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / 2**20 if sys.platform == 'darwin' else peak / 2**10, 1) # bytes on mac, KB on linux
+
+
+def bench_size(size: int, backend: str, queries: int, seed: int, operations: list[str], trace_memory: bool, directory: str) -> dict:
+    """
+    Run the benchmark operations on a database of size contacts.
+
+    Returns:
+        dict: {operation: {'count', 'seconds', 'ops_per_second', 'peak_traced_mb'}}
+    """
+    rng = random.Random(seed)
+    contacts = list(generate_contacts(size, seed))
+    contacts_db = BACKENDS[backend]()
+    results = {}
+
+    def record(operation, count, function):
+        result, seconds, peak_mb = timed(function, trace_memory)
+        results[operation] = {
+            'count': count,
+            'seconds': round(seconds, 6),
+            'ops_per_second': round(count / seconds, 1) if seconds else None,
+            'peak_traced_mb': peak_mb,
+        }
+        return result
+
+    # the database is always built, add is only recorded if asked for
+    def add_all():
+        return [ctdb.add_contact(contacts_db, contact) for contact in contacts]
+    if 'add' in operations:
+        contact_ids = record('add', size, add_all)
+    else:
+        contact_ids = add_all()
+
+    search_terms = [rng.choice(FIRST_NAMES).lower() + str(rng.randint(0, 99)) for _ in range(queries)]
+    phones = [rng.choice(contacts)['phone'] for _ in range(queries)]
+    categories = [rng.choice(CATEGORIES[:3]) for _ in range(queries)]
+    searches = {
+        'search_name': lambda: [ctdb.search_contacts_by_name(contacts_db, term) for term in search_terms],
+        'search_category': lambda: [ctdb.search_contacts_by_category(contacts_db, category) for category in categories],
+        'find_phone': lambda: [ctdb.find_contact_by_phone(contacts_db, phone) for phone in phones],
+    }
+    for operation, search in searches.items():
+        if operation in operations:
+            record(operation, queries, search)
+
+    if 'update' in operations:
+        updates = [(rng.choice(contact_ids), {'notes': f'update {i}', 'address': {'city': 'Coolville'}}) for i in range(queries)]
+        record('update', queries, lambda: [ctdb.update_contact(contacts_db, contact_id, field_updates) for contact_id, field_updates in updates])
+    if 'merge' in operations:
+        pairs = [rng.sample(contact_ids, 2) for _ in range(queries)]
+        record('merge', queries, lambda: [ctdb.merge_contacts(contacts_db, id1, id2, resolve=keep_first) for id1, id2 in pairs])
+
+    filename = os.path.join(directory, f'bench_{size}.csv')
+    count = len(contacts_db)
+    if 'save' in operations:
+        record('save', count, lambda: ctdb.write_contacts_csv(contacts_db, filename))
+    elif 'load' in operations:
+        ctdb.write_contacts_csv(contacts_db, filename)
+    if 'load' in operations:
+        del contacts_db # free it first so peak memory is the load alone
+        record('load', count, lambda: ctdb.load_contacts_from_file(filename, BACKENDS[backend]()))
+    return results
+
+
+def bench_size_isolated(*args) -> tuple:
+    """
+    bench_size in a worker process (see run_benchmarks).
+
+    Returns:
+        tuple: (bench_size result, peak RSS of the worker in MB)
+    """
+    return bench_size(*args), peak_rss_mb()
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_benchmarks(sizes: list[int], backend: str = 'indexed', queries: int = 100, seed: int = 0,
+                   operations: list[str] = OPERATIONS, trace_memory: bool = False) -> dict:
+    """
+    Benchmark every size and return the json report.
+    Timings are taken without tracemalloc unless trace_memory is set, it slows python down a lot.
+    Each size runs in a freshly spawned process, so its peak_rss_mb isn't the peak of a bigger earlier size.
+    """
+    report = {
+        'meta': {
+            'backend': backend, 'queries': queries, 'seed': seed, 'trace_memory': trace_memory,
+            'python': platform.python_version(), 'platform': platform.platform(),
+            'commit': git_commit(), 'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': [],
+    }
+    context = multiprocessing.get_context('spawn') # forked workers would start out with this process's memory
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            with context.Pool(1) as pool:
+                operation_results, peak_rss = pool.apply(bench_size_isolated, (size, backend, queries, seed, operations, trace_memory, directory))
+            report['results'].append({'size': size, 'operations': operation_results, 'peak_rss_mb': peak_rss})
+            print(f"{size:>10} contacts: " + ', '.join(f"{operation} {result['ops_per_second']}/s" for operation, result in operation_results.items()), file=sys.stderr)
+    return report
+
+
+def compare_reports(old: dict, new: dict) -> str:
+    """
+    Table of throughput changes between two reports (positive is faster).
+    """
+    old_results = {(result['size'], operation): stats for result in old['results'] for operation, stats in result['operations'].items()}
+    lines = [f"{'size':>10}  {'operation':<16}{'old/s':>14}{'new/s':>14}{'change':>10}"]
+    for result in new['results']:
+        for operation, stats in result['operations'].items():
+            old_stats = old_results.get((result['size'], operation))
+            if old_stats is None or not old_stats['ops_per_second'] or not stats['ops_per_second']:
+                continue
+            change = (stats['ops_per_second'] / old_stats['ops_per_second'] - 1) * 100
+            lines.append(f"{result['size']:>10}  {operation:<16}{old_stats['ops_per_second']:>14.1f}{stats['ops_per_second']:>14.1f}{change:>+9.1f}%")
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark contact_manager on synthetic databases")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help="database sizes, e.g. 1000 10000000")
+    parser.add_argument('--backend', choices=BACKENDS, default='indexed')
+    parser.add_argument('--queries', type=int, default=100, help="searches, updates and merges per size")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--operations', nargs='+', choices=OPERATIONS, default=OPERATIONS)
+    parser.add_argument('--trace-memory', action='store_true', help="record peak memory per operation with tracemalloc (slower)")
+    parser.add_argument('--output', help="write the json report here instead of stdout")
+    parser.add_argument('--compare', help="earlier json report to compare the new one with")
+    options = parser.parse_args()
+
+    report = run_benchmarks(options.sizes, options.backend, options.queries, options.seed, options.operations, options.trace_memory)
+    if options.output:
+        with open(options.output, 'w') as report_file:
+            json.dump(report, report_file, indent=4)
+    else:
+        print(json.dumps(report, indent=4))
+    if options.compare:
+        with open(options.compare) as old_file:
+            print(compare_reports(json.load(old_file), report), file=sys.stderr)
@@ -0,0 +1,156 @@
+import threading
+import time
+from collections import OrderedDict
+
+from contact_changes import ChangeFeed
+from contact_index import NAME_GRAM_SIZE, padded_name_grams
+
+# fields each kind of search looks at, an update that changes none of them can only
+# affect cached results that already hold the contact
+SEARCH_FIELDS = {
+    'name': ('first_name', 'last_name'),
+    'name_prefix': ('first_name', 'last_name'),
+    'fuzzy_name': ('first_name', 'last_name'),
+    'category': ('category',),
+    'phone': ('phone',),
+}
+
+
+def could_match(kind: str, term: str, contact: dict[str, str|dict]) -> bool:
+    """
+    Whether contact could be in the result of the search kind(term).
+    Never False for a contact the search would return, may be True for one it wouldn't
+    (fuzzy searches keep only the best matches).
+    """
+    if kind == 'category':
+        return contact['category'] == term
+    if kind == 'phone':
+        return contact['phone'] == term
+    name = (contact['first_name'] + ' ' + contact['last_name']).lower()
+    if kind == 'name':
+        return term.lower() in name
+    if kind == 'name_prefix':
+        return contact['first_name'].lower().startswith(term.lower()) or contact['last_name'].lower().startswith(term.lower())
+    # fuzzy: anything sharing a trigram, short terms fall back to a substring search
+    if len(term) < NAME_GRAM_SIZE:
+        return term.lower() in name
+    return bool(padded_name_grams(term.lower()) & padded_name_grams(name))
+
+
+def result_ids(result) -> set:
+    if isinstance(result, tuple): # find_contact_by_phone
+        return {result[0]} if result[0] is not None else set()
+    return set(result)
+
+
+class SearchCache:
+    """
+    Bounded LRU cache of search results with an optional time to live.
+    Attach it to a contacts database (any dict subclass, e.g. IndexedContactsDB) with
+    attach(contacts_db): search_contacts_by_name, search_contacts_by_name_prefix,
+    fuzzy_search_contacts_by_name, search_contacts_by_category and find_contact_by_phone
+    then answer repeated searches from the cache.
+
+    Invalidation is driven by the database's change feed (one is attached if it doesn't
+    have one), so add_contact, bulk_add_contacts, update_contact, delete_contact and
+    merge_contacts only drop the cached results the change can affect: results that hold
+    the contact, and searches the changed contact matches now. Writes that go straight
+    to contacts_db[contact_id] bypass the feed, call clear() after those.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.contacts_db = None
+        self._lock = threading.Lock()
+        self._entries = OrderedDict() # (kind, args) -> (result, ids in result, expiry time), oldest first
+        self._generation = 0 # bumped by every invalidation, results computed across one aren't stored
+        self._subscription = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def attach(self, contacts_db):
+        """
+        Start caching searches on contacts_db.
+        """
+        if getattr(contacts_db, 'change_feed', None) is None:
+            contacts_db.change_feed = ChangeFeed()
+        self.contacts_db = contacts_db
+        contacts_db.search_cache = self
+        self._subscription = contacts_db.change_feed.subscribe(self.on_change, on_error=lambda event, exception: self.clear())
+        return self
+
+    def detach(self):
+        if self.contacts_db is not None:
+            self.contacts_db.change_feed.unsubscribe(self._subscription)
+            del self.contacts_db.search_cache
+            self.contacts_db = None
+        self.clear()
+
+    def get(self, kind: str, args: tuple, search):
+        """
+        Cached result of the search kind(*args), search() is called on a miss.
+        Result dicts are copied, so callers can change them without touching the cache.
+        """
+        key = (kind, args)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[2] is None or entry[2] > time.monotonic()):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(entry[0]) if isinstance(entry[0], dict) else entry[0]
+            if entry is not None: # expired
+                del self._entries[key]
+            self.misses += 1
+            generation = self._generation
+
+        result = search() # outside the lock, other searches (and nested cached ones) can run meanwhile
+        with self._lock:
+            if generation == self._generation:
+                expiry = None if self.ttl is None else time.monotonic() + self.ttl
+                self._entries[key] = (result, result_ids(result), expiry)
+                self._entries.move_to_end(key)
+                if len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return dict(result) if isinstance(result, dict) else result
+
+    def on_change(self, event: dict):
+        """
+        Change feed callback, drops the cached results the change can affect.
+        """
+        contact_id = event['contact_id']
+        changed_fields = set(event['changes'])
+        contact = None
+        if event['op'] != 'delete':
+            contact = self.contacts_db.get(contact_id)
+
+        with self._lock:
+            self._generation += 1
+            stale = []
+            for key, (result, ids, expiry) in self._entries.items():
+                kind, args = key
+                if contact_id in ids:
+                    stale.append(key)
+                elif contact is not None and changed_fields.intersection(SEARCH_FIELDS[kind]) and could_match(kind, args[0], contact):
+                    stale.append(key)
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries), 'maxsize': self.maxsize,
+                'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'invalidations': self.invalidations, 'evictions': self.evictions,
+            }
@@ -0,0 +1,139 @@
+import threading
+import time
+from collections import deque
+
+
+def flatten_contact(contact: dict[str, str|dict]) -> dict[str, str]:
+    """
+    Contact as a flat dict, nested fields get a dotted name ('address.city').
+    """
+    flat = {}
+    for field, value in contact.items():
+        if type(value) is dict:
+            for sub_field, sub_value in value.items():
+                flat[field + '.' + sub_field] = sub_value
+        else:
+            flat[field] = value
+    return flat
+
+
+def unflatten_contact(flat: dict[str, str]) -> dict[str, str|dict]:
+    contact = {}
+    for field, value in flat.items():
+        if '.' in field:
+            field, sub_field = field.split('.', 1)
+            contact.setdefault(field, {})[sub_field] = value
+        else:
+            contact[field] = value
+    return contact
+
+
+def contact_delta(old_flat: dict[str, str], new_flat: dict[str, str]) -> dict[str, list]:
+    """
+    Fields that differ between two flattened contacts as {field: [old, new]},
+    None stands for a field that isn't there.
+    """
+    delta = {}
+    for field in list(old_flat) + [field for field in new_flat if field not in old_flat]: # keep field order
+        if old_flat.get(field) != new_flat.get(field):
+            delta[field] = [old_flat.get(field), new_flat.get(field)]
+    return delta
+
+
+class ChangeFeed:
+    """
+    In-process feed of field-level changes to a contacts database.
+    Attach one as contacts_db.change_feed (any dict subclass, e.g. IndexedContactsDB) and
+    add_contact, bulk_add_contacts, update_contact, delete_contact and merge_contacts publish
+    an event for every change:
+
+    {'seq': 12, 'time': 1700000000.0, 'op': 'update', 'contact_id': 'contact_000000001',
+     'changes': {'address.city': ['Anytown', 'Coolvile'], 'last_modified': ['2025-09-01', '2025-09-02']}}
+
+    op is 'add', 'update', 'delete' or 'merge' (merge events also have 'merged_from').
+    changes holds [old, new] per field, old is None for adds and new is None for deletes.
+    seq numbers start at 1 and go up by one, the last `history` events are kept so a
+    subscriber that fell behind can catch up with since().
+
+    A subscriber that raises has missed an event. Its on_error(event, exception) is called
+    so it can resync (SearchCache clears, SortedContactIndex rebuilds); one without an
+    on_error is unsubscribed and its last event kept in failed[subscription_id].
+    """
+
+    def __init__(self, history: int = 10000):
+        self._lock = threading.RLock() # events go out in seq order even with several writers
+        self._subscribers = {} # subscription id -> (callback, on_error)
+        self.failed = {} # subscription id -> event that dropped it
+        self._next_subscription = 1
+        self._history = deque(maxlen=history)
+        self.last_seq = 0
+
+    def subscribe(self, callback, since: int = None, on_error=None) -> int:
+        """
+        Call callback(event) for every new event.
+        If since is given, events after that seq still in the history are sent first.
+        on_error(event, exception) is called if callback raises.
+
+        Returns:
+            int: Subscription id for unsubscribe
+        """
+        with self._lock:
+            if since is not None:
+                for event in self.since(since):
+                    callback(event)
+            subscription_id = self._next_subscription
+            self._next_subscription += 1
+            self._subscribers[subscription_id] = (callback, on_error)
+            return subscription_id
+
+    def unsubscribe(self, subscription_id: int) -> bool:
+        with self._lock:
+            return self._subscribers.pop(subscription_id, None) is not None
+
+    def since(self, seq: int) -> list[dict]:
+        """
+        Events with a seq after the given one that are still in the history.
+        """
+        with self._lock:
+            return [event for event in self._history if event['seq'] > seq]
+
+    def publish(self, op: str, contact_id: str, changes: dict[str, list], **extra) -> dict:
+        with self._lock:
+            self.last_seq += 1
+            event = {'seq': self.last_seq, 'time': time.time(), 'op': op, 'contact_id': contact_id, 'changes': changes}
+            event.update(extra)
+            self._history.append(event)
+            for subscription_id, (callback, on_error) in list(self._subscribers.items()):
+                try:
+                    callback(event)
+                except Exception as e: # a broken subscriber shouldn't break the write that already happened
+                    print(f"Error in change feed subscriber: {e}")
+                    self._subscriber_failed(subscription_id, on_error, event, e)
+            return event
+
+    def _subscriber_failed(self, subscription_id: int, on_error, event: dict, exception: Exception):
+        # the subscriber missed this event, it has to resync or stop getting later ones
+        if on_error is not None:
+            try:
+                on_error(event, exception)
+                return
+            except Exception as e:
+                print(f"Error in change feed subscriber: {e}")
+        del self._subscribers[subscription_id]
+        self.failed[subscription_id] = event
+
+
+def apply_change(contacts_db: dict[str, dict], event: dict):
+    """
+    Apply a change feed event to another database (a cache or replica),
+    keeping it in sync without reloading everything.
+    """
+    if event['op'] in ('add', 'merge'):
+        contacts_db[event['contact_id']] = unflatten_contact({field: new for field, (old, new) in event['changes'].items()})
+    elif event['op'] == 'update':
+        flat = flatten_contact(contacts_db[event['contact_id']])
+        for field, (old, new) in event['changes'].items():
+            flat[field] = new
+        contacts_db[event['contact_id']] = unflatten_contact(flat)
+    elif event['op'] == 'delete':
+        contacts_db.pop(event['contact_id'], None)
@@ -0,0 +1,151 @@
+from array import array
+from collections.abc import MutableMapping
+
+# field order matches the contacts built by load_contacts_from_file
+CONTACT_FIELDS = ('first_name', 'last_name', 'phone', 'email', 'address', 'category', 'notes', 'created_date', 'last_modified')
+ADDRESS_FIELDS = ('street', 'city', 'state', 'zip_code')
+
+# columns with few distinct values are stored as array codes into a shared string table,
+# the rest (mostly unique per contact) as plain lists of strings
+CODED_COLUMNS = ('first_name', 'last_name', 'category', 'created_date', 'last_modified', 'city', 'state', 'zip_code')
+TEXT_COLUMNS = ('phone', 'email', 'notes', 'street')
+
+
+class StringTable:
+    """
+    Maps each distinct string to a small integer code and back.
+    Codes are reference counted: a string no row uses any more is dropped and its code
+    reused, so deletes and updates don't leave old values behind. '' is always code 0
+    and never dropped, blank fields and deleted rows point at it.
+    """
+
+    def __init__(self):
+        self.strings = ['']
+        self.codes = {'': 0}
+        self._refs = [0]
+        self._free_codes = []
+
+    def code(self, value: str) -> int:
+        """
+        Code for value, counted as one more use until it's released.
+        """
+        code = self.codes.get(value)
+        if code is None:
+            if self._free_codes:
+                code = self._free_codes.pop()
+                self.strings[code] = value
+            else:
+                code = len(self.strings)
+                self.strings.append(value)
+                self._refs.append(0)
+            self.codes[value] = code
+        if code:
+            self._refs[code] += 1
+        return code
+
+    def release(self, code: int):
+        if code:
+            self._refs[code] -= 1
+            if not self._refs[code]:
+                del self.codes[self.strings[code]]
+                self.strings[code] = None
+                self._free_codes.append(code)
+
+    def __len__(self):
+        return len(self.codes)
+
+
+class ColumnarContactsDB(MutableMapping):
+    """
+    A contacts database that stores every field as a column keyed by row number
+    instead of one dict per contact. Behaves like the normal contact_id -> contact dict,
+    so add_contact, update_contact, display_contact etc. work unchanged.
+
+    Reading a contact builds a fresh dict from the columns, so changes to that dict
+    are only kept once it is set back (update_contact does this).
+    Missing fields are stored as '', a field that isn't a str raises TypeError and nothing is stored.
+    """
+
+    def __init__(self, contacts=None):
+        self._table = StringTable()
+        self._coded = {column: array('I') for column in CODED_COLUMNS}
+        self._text = {column: [] for column in TEXT_COLUMNS}
+        self._row_of = {}   # contact_id -> row, keeps insertion order like a dict
+        self._free_rows = [] # rows of deleted contacts, reused by new ones
+        if contacts is not None:
+            self.update(contacts)
+
+    def _read(self, column: str, row: int) -> str:
+        if column in self._coded:
+            return self._table.strings[self._coded[column][row]]
+        return self._text[column][row]
+
+    def _write(self, column: str, row: int, value: str):
+        if column in self._coded:
+            code = self._table.code(value)
+            if row == len(self._coded[column]):
+                self._coded[column].append(code)
+            else:
+                self._table.release(self._coded[column][row])
+                self._coded[column][row] = code
+        else:
+            if row == len(self._text[column]):
+                self._text[column].append(value)
+            else:
+                self._text[column][row] = value
+
+    def __getitem__(self, contact_id):
+        row = self._row_of[contact_id]
+        contact = {}
+        for field in CONTACT_FIELDS:
+            if field == 'address':
+                contact['address'] = {addr_field: self._read(addr_field, row) for addr_field in ADDRESS_FIELDS}
+            else:
+                contact[field] = self._read(field, row)
+        return contact
+
+    def __setitem__(self, contact_id, contact):
+        # check the whole row first, failing halfway would leave the columns different lengths
+        address = contact.get('address', {})
+        if not isinstance(address, dict):
+            raise TypeError(f"address must be a dict, not {type(address).__name__}")
+        values = []
+        for field in CONTACT_FIELDS:
+            if field == 'address':
+                values.extend((addr_field, address.get(addr_field, '')) for addr_field in ADDRESS_FIELDS)
+            else:
+                values.append((field, contact.get(field, '')))
+        for column, value in values:
+            if type(value) is not str:
+                raise TypeError(f"{column} must be a str, not {type(value).__name__}")
+
+        if contact_id in self._row_of:
+            row = self._row_of[contact_id]
+        elif self._free_rows:
+            row = self._row_of[contact_id] = self._free_rows.pop()
+        else:
+            row = self._row_of[contact_id] = len(self._coded['category'])
+
+        for column, value in values:
+            self._write(column, row, value)
+
+    def __delitem__(self, contact_id):
+        row = self._row_of.pop(contact_id)
+        for column in CODED_COLUMNS:
+            self._table.release(self._coded[column][row])
+            self._coded[column][row] = 0 # '', so reusing the row doesn't release anything twice
+        for column in TEXT_COLUMNS:
+            self._text[column][row] = '' # let go of the strings, the row gets reused
+        self._free_rows.append(row)
+
+    def __contains__(self, contact_id):
+        return contact_id in self._row_of
+
+    def __iter__(self):
+        return iter(self._row_of)
+
+    def __len__(self):
+        return len(self._row_of)
+
+    def __repr__(self):
+        return f"ColumnarContactsDB({len(self)} contacts, {len(self._table)} distinct strings)"
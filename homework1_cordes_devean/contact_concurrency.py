@@ -0,0 +1,137 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import contact_manager as ctdb
+from contact_index import IndexedContactsDB
+from contact_query import query
+
+
+class ReadWriteLock:
+    """
+    Lets any number of readers in at once, or one writer alone.
+    Waiting writers go first, so a steady stream of searches can't starve updates.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read_lock(self):
+        with self._condition:
+            while self._writer or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write_lock(self):
+        with self._condition:
+            self._waiting_writers += 1
+            while self._writer or self._readers:
+                self._condition.wait()
+            self._waiting_writers -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writer = False
+                self._condition.notify_all()
+
+
+class ConcurrentContactsDB:
+    """
+    Thread-safe wrapper around a contacts database (an IndexedContactsDB by default).
+    Searches take the read lock and can run at the same time, adds, updates, deletes and
+    merges take the write lock so readers never see a half-updated contact or index.
+    Search results are copies, so they don't change under the caller.
+    """
+
+    def __init__(self, contacts_db: dict[str, dict] = None, max_workers: int = 8):
+        self.contacts_db = contacts_db if contacts_db is not None else IndexedContactsDB()
+        self.lock = ReadWriteLock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers)
+
+    # --- writes ---
+
+    def add_contact(self, contact_data: dict, id_allocator=None) -> str:
+        with self.lock.write_lock():
+            return ctdb.add_contact(self.contacts_db, contact_data, id_allocator)
+
+    def bulk_add_contacts(self, contacts, id_allocator=None) -> tuple[list[str], list[tuple[int, str]]]:
+        with self.lock.write_lock():
+            return ctdb.bulk_add_contacts(self.contacts_db, contacts, id_allocator)
+
+    def update_contact(self, contact_id: str, field_updates: dict[str, str|dict]) -> bool:
+        with self.lock.write_lock():
+            return ctdb.update_contact(self.contacts_db, contact_id, field_updates)
+
+    def delete_contact(self, contact_id: str) -> bool:
+        with self.lock.write_lock():
+            return ctdb.delete_contact(self.contacts_db, contact_id)
+
+    def merge_contacts(self, contact_id1: str, contact_id2: str, resolve) -> str:
+        # resolve is required, prompting on stdin while holding the write lock would block everyone
+        with self.lock.write_lock():
+            return ctdb.merge_contacts(self.contacts_db, contact_id1, contact_id2, resolve)
+
+    # --- reads ---
+
+    def _copies(self, result_db: dict[str, dict]) -> dict[str, dict]:
+        return {contact_id: ctdb.copy_contact(contact) for contact_id, contact in result_db.items()}
+
+    def get_contact(self, contact_id: str) -> dict|None:
+        with self.lock.read_lock():
+            contact = self.contacts_db.get(contact_id)
+            return ctdb.copy_contact(contact) if contact is not None else None
+
+    def search_contacts_by_name(self, search_term: str) -> dict[str, dict]:
+        with self.lock.read_lock():
+            return self._copies(ctdb.search_contacts_by_name(self.contacts_db, search_term))
+
+    def search_contacts_by_category(self, category: str) -> dict[str, dict]:
+        with self.lock.read_lock():
+            return self._copies(ctdb.search_contacts_by_category(self.contacts_db, category))
+
+    def find_contact_by_phone(self, phone_number: str) -> tuple:
+        with self.lock.read_lock():
+            contact_id, contact = ctdb.find_contact_by_phone(self.contacts_db, phone_number)
+            return contact_id, ctdb.copy_contact(contact) if contact is not None else None
+
+    def query(self, **filters) -> dict[str, dict]:
+        with self.lock.read_lock():
+            return self._copies(query(self.contacts_db, **filters))
+
+    def check_indexes(self) -> bool:
+        with self.lock.read_lock():
+            return self.contacts_db.check_indexes()
+
+    def parallel_search(self, searches: list[tuple[str, ...]]) -> list:
+        """
+        Run several searches on the thread pool at once.
+
+        Args:
+            searches (list): (method name, *args) tuples, e.g. ('search_contacts_by_name', 'doe')
+
+        Returns:
+            list: Results in the same order as searches
+        """
+        futures = [self._pool.submit(getattr(self, method), *args) for method, *args in searches]
+        return [future.result() for future in futures]
+
+    def close(self):
+        self._pool.shutdown()
+
+    def __len__(self):
+        with self.lock.read_lock():
+            return len(self.contacts_db)
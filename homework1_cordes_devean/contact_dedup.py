@@ -0,0 +1,156 @@
+import re
+
+import contact_manager as ctdb
+
+# how much each matching field adds to a pair's score (max 1.0)
+MATCH_WEIGHTS = {'phone': 0.4, 'email': 0.3, 'name': 0.3}
+DEFAULT_THRESHOLD = 0.6 # two matching fields, a shared phone (family, office line) or email alone isn't enough
+MAX_BLOCK_SIZE = 200    # blocks bigger than this are too common a key to mean anything (e.g. '555-555-5555')
+
+
+def phone_key(contact: dict) -> str:
+    digits = re.sub(r'\D', '', contact.get('phone', ''))
+    return digits if len(digits) >= 7 else ''
+
+
+def email_key(contact: dict) -> str:
+    email = contact.get('email', '').strip().lower()
+    return email if '@' in email else ''
+
+
+def match_name_key(contact: dict) -> str:
+    """
+    Letters of 'firstlast' only, so 'Jo Ann O'Neil' and 'Joann ONeil' match.
+    Not contact_index.name_key, that one keeps spaces and punctuation for substring searches.
+    """
+    return re.sub(r'[^a-z]', '', (contact.get('first_name', '') + contact.get('last_name', '')).lower())
+
+
+def blocking_keys(contact: dict) -> list[str]:
+    """
+    Keys that put a contact in the same block as its possible duplicates.
+    Only contacts that share a key are ever compared.
+    """
+    keys = []
+    if phone_key(contact):
+        keys.append('phone:' + phone_key(contact))
+    if email_key(contact):
+        keys.append('email:' + email_key(contact))
+    if match_name_key(contact):
+        keys.append('name:' + match_name_key(contact))
+    return keys
+
+
+def score_pair(contact1: dict, contact2: dict) -> float:
+    """
+    How likely two contacts are the same person, between 0 and 1.
+    """
+    score = 0.0
+    for field, key_function in (('phone', phone_key), ('email', email_key), ('name', match_name_key)):
+        key1 = key_function(contact1)
+        if key1 and key1 == key_function(contact2):
+            score += MATCH_WEIGHTS[field]
+    return score
+
+
+def find_duplicate_clusters(contacts_db: dict[str, dict], threshold: float = DEFAULT_THRESHOLD,
+                            max_block_size: int = MAX_BLOCK_SIZE) -> list[list[str]]:
+    """
+    Group contacts that are probably the same person.
+    Contacts are blocked by normalized phone, email and name, pairs inside a block are
+    scored with score_pair and pairs scoring at least threshold are joined (union-find),
+    so the work grows with the block sizes and not with len(contacts_db) squared.
+
+    Args:
+        contacts_db (dict): The main contacts database
+        threshold (float): Minimum score_pair for two contacts to be duplicates
+        max_block_size (int): Blocks with more contacts than this are skipped
+
+    Returns:
+        list: Clusters of 2+ contact IDs, each in database order
+    """
+    blocks = {}
+    for contact_id, contact in contacts_db.items():
+        for key in blocking_keys(contact):
+            blocks.setdefault(key, []).append(contact_id)
+
+    parent = {}
+
+    def find(contact_id):
+        root = contact_id
+        while parent.get(root, root) != root:
+            root = parent[root]
+        while contact_id != root: # path compression
+            parent[contact_id], contact_id = root, parent[contact_id]
+        return root
+
+    scored = set()
+    for block in blocks.values():
+        if len(block) < 2 or len(block) > max_block_size:
+            continue
+        for i, id1 in enumerate(block):
+            for id2 in block[i + 1:]:
+                if (id1, id2) in scored: # same pair can share several blocks
+                    continue
+                scored.add((id1, id2))
+                root1, root2 = find(id1), find(id2)
+                if root1 != root2 and score_pair(contacts_db[id1], contacts_db[id2]) >= threshold:
+                    parent[root2] = root1
+                    parent.setdefault(root1, root1)
+
+    clusters = {}
+    for contact_id in contacts_db: # in database order
+        if contact_id in parent:
+            clusters.setdefault(find(contact_id), []).append(contact_id)
+    return [cluster for cluster in clusters.values() if len(cluster) > 1]
+
+
+def keep_first(path: str, value1: str, value2: str) -> str:
+    return value1
+
+
+def merge_cluster(contacts_db: dict[str, dict], contact_ids: list[str], policy: str = 'newest', resolve=None) -> str:
+    """
+    Merge several contacts into one new contact and delete the originals.
+    Blank fields are filled from any contact that has them. Conflicting fields are
+    decided by policy without prompting:
+    - 'newest': value from the contact with the latest last_modified wins
+    - 'oldest': value from the contact with the earliest last_modified wins
+    resolve(path, value1, value2) overrides the policy, it gets the contacts newest first.
+    The merged contact keeps the earliest created_date.
+    Assumes the contacts hold all the keys of a complete contact (like merge_contacts).
+
+    Returns:
+        str: ID of the merged contact
+    """
+    if policy not in ('newest', 'oldest'):
+        raise ValueError("policy must be 'newest' or 'oldest'")
+
+    newest_first = policy == 'newest' or resolve is not None
+    contacts = sorted((contacts_db[contact_id] for contact_id in contact_ids),
+                      key=lambda contact: contact.get('last_modified', ''), reverse=newest_first)
+
+    merged_contact = ctdb.copy_contact(contacts[0]) # never change the stored contact, even for a cluster of one
+    merged_contact.pop('last_modified', None)
+    for contact in contacts[1:]:
+        merged_contact = ctdb.merge_dict(merged_contact, contact, ['created_date', 'last_modified'],
+                                         resolve=resolve if resolve is not None else keep_first)
+    merged_contact['created_date'] = min(contact.get('created_date', '') for contact in contacts)
+
+    for contact_id in contact_ids:
+        ctdb.delete_contact(contacts_db, contact_id)
+    return ctdb.insert_contact(contacts_db, merged_contact, op='merge', merged_from=list(contact_ids)) # sets last_modified to now
+
+
+def merge_duplicates(contacts_db: dict[str, dict], policy: str = 'newest', resolve=None,
+                     threshold: float = DEFAULT_THRESHOLD, max_block_size: int = MAX_BLOCK_SIZE) -> dict[str, list[str]]:
+    """
+    Find every duplicate cluster and merge each one, see find_duplicate_clusters and merge_cluster.
+
+    Returns:
+        dict: {merged contact ID: list of the IDs that were merged into it}
+    """
+    merged = {}
+    for cluster in find_duplicate_clusters(contacts_db, threshold, max_block_size):
+        merged[merge_cluster(contacts_db, cluster, policy, resolve)] = cluster
+    return merged
@@ -0,0 +1,107 @@
+import itertools
+import os
+import threading
+import time
+
+ID_PREFIX = 'contact_'
+ID_DIGITS = 9 # contact_000000001, ids stay sortable as strings up to 999999999
+FALLBACK_ID_PREFIX = 'contact_seq_' # counted ids for when random ones keep colliding, random ids use all 9 digits
+CROCKFORD_BASE32 = '0123456789ABCDEFGHJKMNPQRSTVWXYZ' # in ascii order, so encoded ids sort like the numbers
+
+
+def format_id(num_id: int, prefix: str = ID_PREFIX) -> str:
+    return prefix + str(num_id).zfill(ID_DIGITS)
+
+
+def max_numeric_id(contacts_db: dict[str, dict], prefix: str = ID_PREFIX) -> int:
+    """
+    Largest number used by a <prefix>XXXXXXXXX style id in the database (0 if none).
+    """
+    largest = 0
+    for contact_id in contacts_db:
+        suffix = contact_id[len(prefix):]
+        if contact_id.startswith(prefix) and suffix.isdecimal():
+            largest = max(largest, int(suffix))
+    return largest
+
+
+class MonotonicIdAllocator:
+    """
+    Hands out contact_000000001, contact_000000002, ... in order (or with another prefix).
+    """
+
+    def __init__(self, start: int = 1, prefix: str = ID_PREFIX):
+        self.prefix = prefix
+        self._counter = itertools.count(start) # next() on a count is atomic, safe across threads
+
+    @classmethod
+    def from_db(cls, contacts_db: dict[str, dict], prefix: str = ID_PREFIX):
+        """
+        Allocator that continues after the largest id with its prefix already in contacts_db.
+        """
+        return cls(max_numeric_id(contacts_db, prefix) + 1, prefix)
+
+    def next_id(self) -> str:
+        return format_id(next(self._counter), self.prefix)
+
+    def next_ids(self, count: int) -> list[str]:
+        return [format_id(num_id, self.prefix) for num_id in itertools.islice(self._counter, count)]
+
+
+class ShardedCounterIdAllocator(MonotonicIdAllocator):
+    """
+    Counter for one of num_shards writers that allocate without talking to each other.
+    Shard s hands out s, s + num_shards, s + 2 * num_shards, ... so shards never collide.
+    Ids are in insertion order within a shard, and roughly in order across shards.
+    """
+
+    def __init__(self, shard: int, num_shards: int, start: int = 0):
+        if not 0 <= shard < num_shards:
+            raise ValueError('shard must be between 0 and num_shards - 1')
+        self.shard = shard
+        self.num_shards = num_shards
+        self.prefix = ID_PREFIX
+        # first number >= start that belongs to this shard (0 is skipped, ids start at 1)
+        first = start + (shard - start) % num_shards
+        if first == 0:
+            first = num_shards
+        self._counter = itertools.count(first, num_shards)
+
+    @classmethod
+    def from_db(cls, contacts_db: dict[str, dict], shard: int, num_shards: int):
+        return cls(shard, num_shards, max_numeric_id(contacts_db) + 1)
+
+
+class TimeOrderedIdAllocator:
+    """
+    ULID style ids: contact_ + 26 base32 chars made of a 48 bit millisecond timestamp
+    followed by 80 random bits. Ids sort by creation time, and ids made in the same
+    millisecond increase the random part by one so they still sort in order.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._last_random = 0
+
+    def next_id(self) -> str:
+        with self._lock:
+            now_ms = time.time_ns() // 1000000
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._last_random = int.from_bytes(os.urandom(10), 'big')
+            else: # same millisecond (or the clock went back), keep counting up from the last id
+                self._last_random += 1
+                if self._last_random >= 1 << 80:
+                    self._last_ms += 1
+                    self._last_random = 0
+            value = (self._last_ms << 80) | self._last_random
+
+        chars = []
+        for _ in range(26):
+            chars.append(CROCKFORD_BASE32[value & 31])
+            value >>= 5
+        return ID_PREFIX + ''.join(reversed(chars))
+
+    def next_ids(self, count: int) -> list[str]:
+        return [self.next_id() for _ in range(count)]
@@ -0,0 +1,340 @@
+import heapq
+import itertools
+
+NAME_GRAM_SIZE = 3
+FUZZY_EXACT_POSTINGS = 10000 # fuzzy search counts every shared trigram while the term's postings hold at most this many names
+FUZZY_CANDIDATES = 20        # above that, names rescored per requested result
+FUZZY_SAMPLE_SIZE = 256      # names of a candidate set probed before intersecting it with a posting
+FUZZY_CORE_SIZE = 4096       # cap on a candidate set before it is intersected
+INDEXED_FIELDS = ('phone', 'category', 'email', 'city', 'state', 'zip_code') # exact-match fields with a hash index
+ADDRESS_FIELDS = ('street', 'city', 'state', 'zip_code')
+
+
+def name_key(contact: dict[str, str|dict]) -> str:
+    """
+    Normalized name used by the name index (same string search_contacts_by_name compares against).
+    """
+    return (contact.get('first_name', '') + ' ' + contact.get('last_name', '')).lower()
+
+
+def field_value(contact: dict[str, str|dict], field: str) -> str:
+    """
+    Value of a contact field, address fields (city, state, ...) are looked up in contact['address'].
+    """
+    if field in ADDRESS_FIELDS:
+        return contact.get('address', {}).get(field, '')
+    return contact.get(field, '')
+
+
+def name_grams(name: str) -> set[str]:
+    """
+    All substrings of length NAME_GRAM_SIZE in name.
+    """
+    return {name[i:i + NAME_GRAM_SIZE] for i in range(len(name) - NAME_GRAM_SIZE + 1)}
+
+
+def padded_name_grams(name: str) -> set[str]:
+    """
+    Trigrams of name padded with two spaces in front and one behind ('jon' -> '  j', ' jo', 'jon', 'on '),
+    so the start and end of a word count too and short or misspelled terms still share some with the name.
+    Holds every trigram name_grams(name) has.
+    """
+    return name_grams(' ' * (NAME_GRAM_SIZE - 1) + name + ' ')
+
+
+def name_similarity(term_grams: set[str], name: str, shared: int) -> float:
+    """
+    Dice coefficient between a search term's padded trigrams and a name sharing `shared` of them,
+    1.0 means the same trigrams. The name's padded trigram count is taken as len(name) + 1,
+    which is exact unless a trigram repeats.
+    """
+    return 2 * shared / (len(term_grams) + len(name) + 1)
+
+
+class IndexedContactsDB(dict):
+    """
+    A contacts database (contact_id -> contact) that keeps secondary indexes up to date.
+    Works with every contact_manager function, the search functions use the indexes
+    instead of scanning the whole database.
+
+    Indexes:
+    - hash index for each field in INDEXED_FIELDS (value -> set of ids)
+    - name index: distinct lowercased 'first last' names -> ids, plus a padded trigram
+      index over those names for substring, prefix and fuzzy matching
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self._reset_indexes()
+        self.update(*args, **kwargs)
+
+    def __reduce__(self):
+        # pickle and copy only the contacts, the indexes are rebuilt from them
+        return (type(self), (dict(self),))
+
+    # --- index maintenance ---
+
+    def _reset_indexes(self):
+        self._field_index = {field: {} for field in INDEXED_FIELDS}
+        self._name_ids = {}    # name -> set of ids
+        self._name_grams = {}  # padded trigram -> set of names
+        self._indexed = {}     # id -> (name, field values) as they were indexed
+        self._order = {}       # id -> insertion number, used to return results in dict order
+        self._next_order = 0
+
+    def _index(self, contact_id, contact):
+        name = name_key(contact)
+        values = tuple(field_value(contact, field) for field in INDEXED_FIELDS)
+
+        for field, value in zip(INDEXED_FIELDS, values):
+            self._field_index[field].setdefault(value, set()).add(contact_id)
+
+        if name not in self._name_ids:
+            self._name_ids[name] = set()
+            for gram in padded_name_grams(name):
+                self._name_grams.setdefault(gram, set()).add(name)
+        self._name_ids[name].add(contact_id)
+
+        self._indexed[contact_id] = (name, values)
+
+    def _unindex(self, contact_id):
+        name, values = self._indexed.pop(contact_id)
+
+        for field, value in zip(INDEXED_FIELDS, values):
+            ids = self._field_index[field][value]
+            ids.discard(contact_id)
+            if not ids:
+                del self._field_index[field][value]
+
+        ids = self._name_ids[name]
+        ids.discard(contact_id)
+        if not ids: # last contact with this name, drop it from the trigram index
+            del self._name_ids[name]
+            for gram in padded_name_grams(name):
+                names = self._name_grams[gram]
+                names.discard(name)
+                if not names:
+                    del self._name_grams[gram]
+
+    def reindex(self, contact_id):
+        """
+        Re-index a contact after it was changed in place.
+        """
+        self._unindex(contact_id)
+        self._index(contact_id, self[contact_id])
+
+    def check_indexes(self) -> bool:
+        """
+        Rebuild the indexes from scratch and compare, True if they were consistent.
+        """
+        rebuilt = IndexedContactsDB(self)
+        return (self._field_index == rebuilt._field_index and self._name_ids == rebuilt._name_ids
+                and self._name_grams == rebuilt._name_grams
+                and self._indexed == rebuilt._indexed and list(self) == self.in_order(self._order))
+
+    # --- dict methods that add or remove contacts ---
+
+    def __setitem__(self, contact_id, contact):
+        if contact_id in self:
+            self._unindex(contact_id)
+        else:
+            self._order[contact_id] = self._next_order
+            self._next_order += 1
+        super().__setitem__(contact_id, contact)
+        self._index(contact_id, contact)
+
+    def __delitem__(self, contact_id):
+        super().__delitem__(contact_id)
+        self._unindex(contact_id)
+        del self._order[contact_id]
+
+    def update(self, *args, **kwargs):
+        for contact_id, contact in dict(*args, **kwargs).items():
+            self[contact_id] = contact
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def setdefault(self, contact_id, contact=None):
+        if contact_id not in self:
+            self[contact_id] = contact
+        return self[contact_id]
+
+    def pop(self, contact_id, *default):
+        if contact_id not in self:
+            if default:
+                return default[0]
+            raise KeyError(contact_id)
+        contact = self[contact_id]
+        del self[contact_id]
+        return contact
+
+    def popitem(self):
+        contact_id = next(reversed(self))
+        return contact_id, self.pop(contact_id)
+
+    def clear(self):
+        super().clear()
+        self._reset_indexes()
+
+    # --- lookups ---
+
+    def in_order(self, ids) -> list[str]:
+        """
+        ids sorted the way they are ordered in the database.
+        """
+        return sorted(ids, key=self._order.__getitem__)
+
+    def _names_containing(self, term: str) -> set[str]:
+        if len(term) >= NAME_GRAM_SIZE:
+            # every trigram of the term has to be in the name, start with the rarest posting
+            postings = sorted((self._name_grams.get(gram, set()) for gram in name_grams(term)), key=len)
+            candidates = set(postings[0])
+            for posting in postings[1:]:
+                candidates &= posting
+                if not candidates:
+                    break
+        else:
+            # short term, any trigram containing it is a candidate (padding gives every name some)
+            candidates = set()
+            for gram, names in self._name_grams.items():
+                if term in gram:
+                    candidates |= names
+
+        return {name for name in candidates if term in name}
+
+    def ids_for_name(self, term: str) -> set[str]:
+        """
+        Ids of contacts whose 'first last' name contains term (case-insensitive).
+        """
+        ids = set()
+        for name in self._names_containing(term.lower()):
+            ids |= self._name_ids[name]
+        return ids
+
+    def ids_for_name_prefix(self, prefix: str) -> set[str]:
+        """
+        Ids of contacts whose first or last name starts with prefix (case-insensitive).
+        """
+        prefix = prefix.lower()
+        return {contact_id for contact_id in self.ids_for_name(prefix)
+                if self[contact_id].get('first_name', '').lower().startswith(prefix)
+                or self[contact_id].get('last_name', '').lower().startswith(prefix)}
+
+    def ids_for_field(self, field: str, value: str) -> set[str]:
+        """
+        Ids of contacts with field == value, field must be in INDEXED_FIELDS.
+        """
+        return set(self._field_index[field].get(value, ()))
+
+    def count_for_field(self, field: str, value: str) -> int:
+        """
+        Number of contacts with field == value, without copying the id set.
+        """
+        return len(self._field_index[field].get(value, ()))
+
+    def search_name(self, search_term: str) -> dict[str, dict]:
+        return {contact_id: self[contact_id] for contact_id in self.in_order(self.ids_for_name(search_term))}
+
+    def search_name_prefix(self, prefix: str) -> dict[str, dict]:
+        return {contact_id: self[contact_id] for contact_id in self.in_order(self.ids_for_name_prefix(prefix))}
+
+    def fuzzy_name_ids(self, search_term: str, limit: int = 10, min_score: float = 0.0) -> list[tuple[str, float]]:
+        """
+        Ids of the contacts whose names are most similar to search_term (typos allowed),
+        best first, see name_similarity. Terms shorter than a trigram fall back to a
+        plain substring search. When the term's trigrams are common (more than
+        FUZZY_EXACT_POSTINGS names) only the names picked by _fuzzy_candidates are
+        scored, so the result can miss a few names that score as well as the last ones returned.
+
+        Returns:
+            list: Up to limit (contact_id, score) tuples
+        """
+        term = search_term.lower()
+        if len(term) < NAME_GRAM_SIZE:
+            return [(contact_id, 1.0) for contact_id in self.in_order(self.ids_for_name(term))[:limit]]
+
+        term_grams = padded_name_grams(term)
+        postings = sorted((self._name_grams.get(gram, ()) for gram in term_grams), key=len) # rarest first
+
+        if sum(map(len, postings)) <= FUZZY_EXACT_POSTINGS:
+            # count shared trigrams per name, only names sharing at least one are looked at
+            shared = {}
+            for posting in postings:
+                for name in posting:
+                    shared[name] = shared.get(name, 0) + 1
+        else:
+            # too many names to count them all, score the likeliest ones exactly
+            shared = {name: len(term_grams & padded_name_grams(name))
+                      for name in self._fuzzy_candidates(postings, FUZZY_CANDIDATES * limit)}
+
+        scores = {name: name_similarity(term_grams, name, count) for name, count in shared.items()}
+        best_names = heapq.nlargest(limit, (name for name in scores if scores[name] >= min_score), key=scores.__getitem__)
+
+        results = []
+        for name in best_names:
+            for contact_id in self.in_order(self._name_ids[name]):
+                results.append((contact_id, scores[name]))
+        return results[:limit]
+
+    def _fuzzy_candidates(self, postings: list[set[str]], wanted: int) -> set[str]:
+        """
+        About wanted names likely to share the most trigrams with a term, in bounded time.
+        Narrows the rarest posting by the others (skipping a posting that would leave nothing),
+        then takes names from the narrowest sets first, shortest names first.
+
+        Args:
+            postings: The term's trigram postings, rarest first
+
+        Returns:
+            set: Candidate names
+        """
+        levels = [] # each set is a subset of the one before
+        for posting in postings:
+            if not posting:
+                continue
+            if not levels:
+                levels.append(posting)
+                continue
+
+            core = levels[-1]
+            if len(core) > FUZZY_SAMPLE_SIZE:
+                # probe a sample first, most postings hold all or none of a large set
+                hits = sum(name in posting for name in itertools.islice(core, FUZZY_SAMPLE_SIZE))
+                if hits == FUZZY_SAMPLE_SIZE:
+                    levels.append(core)
+                    continue
+                narrowed = set(itertools.islice(core, FUZZY_CORE_SIZE)) & posting if hits else None
+            else:
+                narrowed = core & posting
+
+            if narrowed:
+                levels.append(narrowed)
+            elif len(levels) == 1:
+                # the rarest trigram matches nothing else, likely a typo, start over from this one
+                levels = [posting]
+
+        candidates = set()
+        for level in reversed(levels):
+            if len(level) <= wanted - len(candidates):
+                candidates |= level
+            else:
+                pool = itertools.islice((name for name in level if name not in candidates), 4 * wanted)
+                candidates.update(heapq.nsmallest(wanted - len(candidates), pool, key=len))
+            if len(candidates) >= wanted:
+                break
+        return candidates
+
+    def fuzzy_search_name(self, search_term: str, limit: int = 10, min_score: float = 0.0) -> dict[str, dict]:
+        return {contact_id: self[contact_id] for contact_id, _ in self.fuzzy_name_ids(search_term, limit, min_score)}
+
+    def search_category(self, category: str) -> dict[str, dict]:
+        return {contact_id: self[contact_id] for contact_id in self.in_order(self._field_index['category'].get(category, ()))}
+
+    def find_phone(self, phone_number: str) -> tuple:
+        ids = self._field_index['phone'].get(phone_number)
+        if not ids:
+            return None, None
+        contact_id = min(ids, key=self._order.__getitem__) # first match in dict order, like the full scan
+        return contact_id, self[contact_id]
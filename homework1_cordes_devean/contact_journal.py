@@ -0,0 +1,140 @@
+import json
+import os
+
+import contact_manager as ctdb
+from contact_index import IndexedContactsDB
+
+
+class JournaledContactsDB(IndexedContactsDB):
+    """
+    An indexed contacts database that persists every change as it happens.
+
+    The database lives in a csv snapshot (same format as save_contacts_to_file) plus a
+    write-ahead log. Every add, update, delete and merge appends one json line to the log
+    instead of rewriting the whole csv. compact() writes a fresh snapshot and empties the
+    log, it runs automatically every compact_every log records.
+    Opening an existing journal loads the snapshot and replays the log on top of it,
+    a damaged snapshot raises instead of loading part of it.
+
+    Log records:
+    {"op": "set", "id": contact_id, "contact": contact_data}
+    {"op": "del", "id": contact_id}
+    """
+
+    def __init__(self, snapshot_filename: str, log_filename: str = None, compact_every: int = 10000, sync: bool = False):
+        """
+        Args:
+            snapshot_filename (str): csv snapshot file (.csv is added if missing)
+            log_filename (str): Log file, defaults to the snapshot name with .log
+            compact_every (int): Compact after this many log records (0 to never compact automatically)
+            sync (bool): fsync the log after every record, slower but survives power loss
+        """
+        if not snapshot_filename.endswith('.csv'):
+            snapshot_filename += '.csv'
+        self.snapshot_filename = snapshot_filename
+        self.log_filename = log_filename if log_filename is not None else snapshot_filename[:-len('.csv')] + '.log'
+        self.compact_every = compact_every
+        self.sync = sync
+        self._log = None # not logging while the snapshot and log are replayed
+        self._log_records = 0
+
+        super().__init__()
+        try:
+            # not load_contacts_from_file, it prints errors and keeps going, compact() would then overwrite the snapshot with part of it
+            for batch in ctdb.iter_contact_batches(self.snapshot_filename):
+                self.update(batch)
+        except FileNotFoundError:
+            pass
+        self._replay()
+        self._log = open(self.log_filename, 'a')
+
+    def _replay(self):
+        """
+        Apply the log records on top of the snapshot.
+        A half written last record (from a crash in the middle of a write) is cut off the
+        file so new records don't get appended to it, a bad record anywhere else means
+        the log is corrupt and raises ValueError.
+        """
+        try:
+            log = open(self.log_filename, 'rb')
+        except FileNotFoundError:
+            return
+        with log:
+            good_end = 0 # offset after the last complete record
+            line_number = 0
+            while line := log.readline():
+                line_number += 1
+                try:
+                    if not line.endswith(b'\n'): # every record is written with its newline in one go
+                        raise ValueError('record without newline')
+                    record = json.loads(line)
+                except ValueError:
+                    if log.readline(): # not the last line
+                        raise ValueError(f'{self.log_filename} is corrupt at line {line_number}') from None
+                    break
+                if record['op'] == 'set':
+                    self[record['id']] = record['contact']
+                elif record['op'] == 'del' and record['id'] in self:
+                    del self[record['id']]
+                self._log_records += 1
+                good_end = log.tell()
+            end = log.seek(0, os.SEEK_END)
+        if end > good_end:
+            with open(self.log_filename, 'r+b') as log:
+                log.truncate(good_end)
+
+    def _append(self, record: dict):
+        if self._log is None:
+            return
+
+        self._log.write(json.dumps(record) + '\n')
+        self._log.flush()
+        if self.sync:
+            os.fsync(self._log.fileno())
+
+        self._log_records += 1
+        if self.compact_every and self._log_records >= self.compact_every:
+            self.compact()
+
+    def __setitem__(self, contact_id, contact):
+        super().__setitem__(contact_id, contact)
+        self._append({'op': 'set', 'id': contact_id, 'contact': contact})
+
+    def __delitem__(self, contact_id):
+        super().__delitem__(contact_id)
+        self._append({'op': 'del', 'id': contact_id})
+
+    def clear(self):
+        super().clear()
+        self.compact()
+
+    def compact(self):
+        """
+        Write the whole database to a new snapshot and start an empty log.
+        The snapshot is written to a temp file and renamed, so a crash leaves either the
+        old snapshot + log or the new snapshot (replaying the old log on it is harmless).
+        """
+        if len(self) == 0:
+            if os.path.exists(self.snapshot_filename):
+                os.remove(self.snapshot_filename)
+        else:
+            ctdb.write_contacts_csv(self, self.snapshot_filename, sync=True)
+
+        if self._log is not None:
+            self._log.close()
+            self._log = open(self.log_filename, 'w')
+        self._log_records = 0
+
+    def __reduce__(self):
+        raise TypeError(f"cannot pickle or copy {type(self).__name__}, it owns an open log file")
+
+    def close(self):
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,7 +1,18 @@
 import time
-import re
 import random
 import csv
+import os
+import io
+import multiprocessing
+import heapq
+import functools
+import inspect
+
+from contact_changes import contact_delta, flatten_contact
+from contact_ids import FALLBACK_ID_PREFIX, MonotonicIdAllocator
+from contact_validation import CATEGORIES, PHONE_PATTERN, validate_contact
+from contact_index import NAME_GRAM_SIZE, padded_name_grams, name_similarity
+from contact_sorted import DATE_FIELDS, decode_cursor, encode_cursor, sort_key
 
 def create_contact() -> dict[str, str|dict]:
     """
@@ -25,7 +36,7 @@ def create_contact() -> dict[str, str|dict]:
     
     while True:
         phone_number = input("Enter contact's phone number: ").strip()
-        if re.match('\d{3}-\d{3}-\d{4}', phone_number):
+        if PHONE_PATTERN.fullmatch(phone_number):
             break
         elif phone_number == '':
             print("Error - phone number is required")
@@ -79,21 +90,41 @@ def complete_partial(partial_contact: dict[str, str|dict]) -> dict[str, str|dict
     complete_contact['last_modified'] = time.strftime('%Y-%m-%d')
     
     return complete_contact
+
+
+def copy_contact(contact: dict[str, str|dict]) -> dict[str, str|dict]:
+    """
+    Copy of a contact (and its address), safe to hand out while the database keeps changing.
+    """
+    contact = dict(contact)
+    if isinstance(contact.get('address'), dict):
+        contact['address'] = dict(contact['address'])
+    return contact
     
 
-def add_contact(contacts_db: dict[str, dict], contact_data: dict) -> str:
+def new_contact_id(contacts_db: dict[str, dict], id_allocator=None) -> str:
     """
-    Add a new contact to the database.
-    Generate unique ID and add contact with proper validation.
+    Pick an id that isn't used in contacts_db yet.
+    Uses id_allocator (or contacts_db.id_allocator) if given, see contact_ids.py.
+    Otherwise draws random ids, and falls back to counted contact_seq_XXXXXXXXX ids
+    if random ids keep colliding. That allocator is kept as contacts_db.id_allocator
+    (if the db takes attributes), so later adds don't have to guess or rescan.
 
     Args:
         contacts_db (dict): The main contacts database
-        contact_data (dict): Contact information dictionary
+        id_allocator: Object with a next_id() method, or None
 
     Returns:
-        str: The generated contact ID, or None if addition failed
+        str: The new contact ID
     """
-    contact_data = contact_data.copy() # dont edit original contact dict when doing db functions
+    if id_allocator is None:
+        id_allocator = getattr(contacts_db, 'id_allocator', None)
+    
+    if id_allocator is not None:
+        contact_id = id_allocator.next_id()
+        while contact_id in contacts_db: # only if the db also has ids from somewhere else
+            contact_id = id_allocator.next_id()
+        return contact_id
     
     num_id = random.randint(1, 999999999)
     contact_id = "contact_" + "0" * (9 - len(str(num_id))) + str(num_id)
@@ -104,8 +135,41 @@ def add_contact(contacts_db: dict[str, dict], contact_data: dict) -> str:
         contact_id = "contact_" + "0" * (9 - len(str(num_id))) + str(num_id)
         tries += 1
     
-    if contact_id in contacts_db:
-        return None
+    if contact_id in contacts_db: # db is getting full, stop guessing
+        id_allocator = MonotonicIdAllocator.from_db(contacts_db, FALLBACK_ID_PREFIX)
+        try:
+            contacts_db.id_allocator = id_allocator
+        except AttributeError: # plain dict, the next fallback scans again
+            pass
+        contact_id = id_allocator.next_id()
+    
+    return contact_id
+
+
+def add_contact(contacts_db: dict[str, dict], contact_data: dict, id_allocator=None) -> str:
+    """
+    Add a new contact to the database.
+    Generate unique ID and add contact with proper validation.
+
+    Args:
+        contacts_db (dict): The main contacts database
+        contact_data (dict): Contact information dictionary
+        id_allocator: Where the ID comes from, see new_contact_id
+
+    Returns:
+        str: The generated contact ID
+    """
+    return insert_contact(contacts_db, contact_data, id_allocator)
+
+
+def insert_contact(contacts_db: dict[str, dict], contact_data: dict, id_allocator=None, op='add', **event_extra) -> str:
+    """
+    add_contact, but reported to contacts_db.change_feed (if there is one) as op with
+    event_extra added to the event, used by the merge functions.
+    """
+    contact_data = contact_data.copy() # dont edit original contact dict when doing db functions
+    
+    contact_id = new_contact_id(contacts_db, id_allocator)
     
     # if doesn't have created_date and/or last_modifed add them with current time
     if 'created_date' not in contact_data:
@@ -115,9 +179,96 @@ def add_contact(contacts_db: dict[str, dict], contact_data: dict) -> str:
         contact_data['last_modified'] = time.strftime('%Y-%m-%d')
     
     contacts_db[contact_id] = contact_data
+    
+    change_feed = getattr(contacts_db, 'change_feed', None)
+    if change_feed is not None:
+        change_feed.publish(op, contact_id, contact_delta({}, flatten_contact(contact_data)), **event_extra)
     return contact_id
 
 
+LENIENT_ERRORS = ('bad_email', 'bad_zip', 'bad_state', 'bad_category') # unknown category just becomes ''
+
+
+def normalize_contact(partial_contact: dict[str, str|dict], today: str) -> tuple[dict|None, str|None]:
+    """
+    Check a partial contact and complete it like complete_partial, without raising.
+    Keeps its own created_date/last_modified if it has them, otherwise uses today.
+
+    Returns:
+        tuple: (complete contact, None) if valid, (None, reason) if not
+    """
+    if not isinstance(partial_contact, dict):
+        return None, 'not_a_dict'
+    
+    address = partial_contact.get('address', {})
+    contact = {key: partial_contact.get(key, '') for key in BLANK_CONTACT if key != 'address'}
+    contact['address'] = {addr_key: address.get(addr_key, '') for addr_key in BLANK_CONTACT['address']} if isinstance(address, dict) else address
+    
+    # bulk adds only reject what they always did (missing or mistyped fields, bad phones),
+    # email, zip and state formats aren't enforced anywhere else either
+    errors = [error for error in validate_contact(contact) if error not in LENIENT_ERRORS]
+    if errors:
+        return None, ', '.join(errors)
+    if contact['category'] not in CATEGORIES:
+        contact['category'] = ''
+    
+    contact['created_date'] = partial_contact.get('created_date', today)
+    contact['last_modified'] = partial_contact.get('last_modified', today)
+    return contact, None
+
+
+def bulk_add_contacts(contacts_db: dict[str, dict], contacts, id_allocator=None) -> tuple[list[str], list[tuple[int, str]]]:
+    """
+    Validate, normalize and add many contacts in one pass.
+    Each row goes through normalize_contact with today's date looked up once for the
+    whole batch, bad rows are skipped instead of added.
+
+    Args:
+        contacts_db (dict): The main contacts database
+        contacts (iterable): Partial contact dicts to add
+        id_allocator: Where the IDs come from, see new_contact_id
+
+    Returns:
+        tuple: (list of new contact IDs in row order, list of (row_number, reason) for rejected rows)
+    """
+    today = time.strftime('%Y-%m-%d')
+    
+    valid_contacts = []
+    rejects = []
+    for row_number, partial_contact in enumerate(contacts):
+        contact, reason = normalize_contact(partial_contact, today)
+        if contact is None:
+            rejects.append((row_number, reason))
+        else:
+            valid_contacts.append(contact)
+    
+    if id_allocator is None:
+        id_allocator = getattr(contacts_db, 'id_allocator', None)
+    
+    if id_allocator is not None and hasattr(id_allocator, 'next_ids'):
+        contact_ids = id_allocator.next_ids(len(valid_contacts))
+        for i, contact_id in enumerate(contact_ids):
+            if contact_id in contacts_db: # only if the db also has ids from somewhere else
+                contact_ids[i] = new_contact_id(contacts_db, id_allocator)
+    else:
+        contact_ids = []
+        batch_ids = set() # not in the db until the end, so random ids have to be checked against the batch too
+        for _ in valid_contacts:
+            contact_id = new_contact_id(contacts_db, id_allocator)
+            while contact_id in batch_ids:
+                contact_id = new_contact_id(contacts_db, id_allocator)
+            batch_ids.add(contact_id)
+            contact_ids.append(contact_id)
+    
+    change_feed = getattr(contacts_db, 'change_feed', None)
+    for contact_id, contact in zip(contact_ids, valid_contacts):
+        contacts_db[contact_id] = contact
+        if change_feed is not None:
+            change_feed.publish('add', contact_id, contact_delta({}, flatten_contact(contact)))
+    
+    return contact_ids, rejects
+
+
 def display_contact(contacts_db: dict[str, dict[str, str|dict]], contact_id: str) -> bool:
     """
     Display a formatted view of a single contact.
@@ -145,14 +296,96 @@ def display_contact(contacts_db: dict[str, dict[str, str|dict]], contact_id: str
                 print('\n')
 
 
-def list_all_contacts(contacts_db: dict[str, dict]):
+def list_all_contacts(contacts_db: dict[str, dict], sort_by: str = None):
     """
     Display a summary list of all contacts (ID, name, phone).
     Args:
         contacts_db (dict): The main contacts database
+        sort_by (str): Sort order (see list_contacts_sorted), database order if None
+    """
+    if sort_by is None:
+        pages = [contacts_db]
+    else:
+        pages = iter_contacts_sorted(contacts_db, sort_by)
+    for page in pages:
+        for id, contact in page.items():
+            print(f"{id}: {contact['first_name']} {contact['last_name']} - {contact['phone']}")
+
+
+def list_contacts_sorted(contacts_db: dict[str, dict], sort_by: str = 'last_name', limit: int = 50, cursor: str = None, descending: bool = False) -> tuple[dict, str|None]:
     """
-    for id, contact in contacts_db.items():
-        print(f"{id}: {contact['first_name']} {contact['last_name']} - {contact['phone']}")
+    One page of contacts sorted by last_name, first_name, created_date or last_modified
+    (names case-insensitive, ties broken by ID).
+    With a contacts_db.sorted_index (contact_sorted.SortedContactIndex) a page costs
+    O(log N + limit), without one the whole database is scanned for every page.
+
+    Args:
+        contacts_db (dict): The main contacts database
+        sort_by (str): Field to sort by
+        limit (int): Max number of contacts on the page
+        cursor (str): Cursor returned with the previous page, None for the first page
+        descending (bool): Largest first
+
+    Returns:
+        tuple: (page {contact_id: contact_data} in order, cursor for the next page or None if this is the last one)
+    """
+    if limit < 1:
+        raise ValueError('limit must be at least 1')
+    sorted_index = getattr(contacts_db, 'sorted_index', None)
+    if sorted_index is not None:
+        contact_ids, next_cursor = sorted_index.page(sort_by, limit, cursor, descending)
+        return {contact_id: contacts_db[contact_id] for contact_id in contact_ids}, next_cursor
+    
+    after = None if cursor is None else decode_cursor(cursor)
+    keys = [sort_key(sort_by, contact_id, contact) for contact_id, contact in contacts_db.items()]
+    if after is not None:
+        keys = [key for key in keys if (key < after if descending else key > after)]
+    page_keys = heapq.nlargest(limit + 1, keys) if descending else heapq.nsmallest(limit + 1, keys)
+    next_cursor = encode_cursor(page_keys[limit - 1]) if len(page_keys) > limit else None
+    return {key[-1]: contacts_db[key[-1]] for key in page_keys[:limit]}, next_cursor
+
+
+def iter_contacts_sorted(contacts_db: dict[str, dict], sort_by: str = 'last_name', page_size: int = 1000, descending: bool = False):
+    """
+    Yield every contact in sort order one page (dict) at a time.
+    """
+    cursor = None
+    while True:
+        page, cursor = list_contacts_sorted(contacts_db, sort_by, page_size, cursor, descending)
+        if page:
+            yield page
+        if cursor is None:
+            break
+
+
+def find_contacts_by_date(contacts_db: dict[str, dict], field: str = 'last_modified', start: str = None, end: str = None) -> dict[str, dict]:
+    """
+    Find contacts whose created_date or last_modified is in [start, end).
+    Dates are 'YYYY-MM-DD' strings, so 'modified since yesterday' is start=yesterday.
+    With a contacts_db.sorted_index (contact_sorted.SortedContactIndex) this is a range
+    lookup in its date order, otherwise a full scan.
+
+    Args:
+        contacts_db (dict): The main contacts database
+        field (str): 'created_date' or 'last_modified'
+        start (str): First date included, None for no lower bound
+        end (str): First date not included, None for no upper bound
+
+    Returns:
+        dict: Matching contacts {contact_id: contact_data} oldest first
+    """
+    sorted_index = getattr(contacts_db, 'sorted_index', None)
+    if sorted_index is not None:
+        return {contact_id: contacts_db[contact_id] for contact_id in sorted_index.date_range(field, start, end)}
+    
+    if field not in DATE_FIELDS:
+        raise ValueError(f'{field} is not a date field, use one of {", ".join(DATE_FIELDS)}')
+    matches = []
+    for contact_id, contact in contacts_db.items():
+        if (start is None or contact[field] >= start) and (end is None or contact[field] < end):
+            matches.append((contact[field], contact_id))
+    matches.sort()
+    return {contact_id: contacts_db[contact_id] for _, contact_id in matches}
 
 
 def update_contact(contacts_db: dict[str, dict[str, str|dict]], contact_id: str, field_updates: dict[str, str|dict]) -> bool:
@@ -173,6 +406,9 @@ def update_contact(contacts_db: dict[str, dict[str, str|dict]], contact_id: str,
         return False
     
     contact = contacts_db[contact_id]
+    change_feed = getattr(contacts_db, 'change_feed', None)
+    if change_feed is not None:
+        old_fields = flatten_contact(contact) # to report what changed
     
     any_updated = False
     for field, new_value in field_updates.items():
@@ -189,6 +425,9 @@ def update_contact(contacts_db: dict[str, dict[str, str|dict]], contact_id: str,
                                 contact[field][addr_key] = addr_value
     if any_updated:
         contact['last_modified'] = time.strftime('%Y-%m-%d')
+        contacts_db[contact_id] = contact # re-set so an indexed db picks up the changed fields
+        if change_feed is not None:
+            change_feed.publish('update', contact_id, contact_delta(old_fields, flatten_contact(contact)))
     return any_updated
 
 
@@ -206,11 +445,15 @@ def delete_contact(contacts_db: dict[str, dict], contact_id: str) -> bool:
     if contact_id not in contacts_db:
         return False
     else:
+        change_feed = getattr(contacts_db, 'change_feed', None)
+        if change_feed is not None:
+            change_feed.publish('delete', contact_id, contact_delta(flatten_contact(contacts_db[contact_id]), {}))
         del contacts_db[contact_id]
         return True
 
 
-def merge_dict(d1: dict[str, str|dict], d2: dict[str, str|dict], ignore_keys=[], path=''):
+def merge_dict(d1: dict[str, str|dict], d2: dict[str, str|dict], ignore_keys=[], path='', resolve=None):
+    # resolve(path, value1, value2) picks the value for conflicting fields, the user is prompted if it's None
     merged_data = {}
     for key, value in d1.items():
         if key in ignore_keys:
@@ -223,6 +466,8 @@ def merge_dict(d1: dict[str, str|dict], d2: dict[str, str|dict], ignore_keys=[],
                 merged_data[key] = d2[key]
             elif value != '' and d2[key] == '':
                 merged_data[key] = value
+            elif resolve is not None: # both are different and non-blank
+                merged_data[key] = resolve(path + key, value, d2[key])
             else: # both are different and non-blank (prompt user for conflict)
                 while True:
                     user_choice = input(f"Conflicting data in merge on index {path}{key}!\nChoose {value} (1) or {d2[key]} (2): ").strip()
@@ -231,21 +476,22 @@ def merge_dict(d1: dict[str, str|dict], d2: dict[str, str|dict], ignore_keys=[],
                         break
         
         elif type(value) is dict:
-            merged_data[key] = merge_dict(value, d2[key], path = path + f'{key}/') # should only infinitely recurse if the dict or a sub-dict contains itself
+            merged_data[key] = merge_dict(value, d2[key], path = path + f'{key}/', resolve = resolve) # should only infinitely recurse if the dict or a sub-dict contains itself
     
     return merged_data
 
 
-def merge_contacts(contacts_db: dict[str, dict[str, str|dict]], contact_id1: str, contact_id2: str) -> str:
+def merge_contacts(contacts_db: dict[str, dict[str, str|dict]], contact_id1: str, contact_id2: str, resolve=None) -> str:
     """
     Merge two contacts, keeping the most recent information.
-    Prompt user for conflicts in overlapping fields.
+    Prompt user for conflicts in overlapping fields, unless resolve is given.
     Assumes both contacts are valid and hold all required keys
 
     Args:
         contacts_db (dict): The main contacts database
         contact_id1 (str): First contact ID
         contact_id2 (str): Second contact ID
+        resolve (callable): resolve(path, value1, value2) -> value for conflicting fields
 
     Returns:
         str: ID of the merged contact, or None if merge failed
@@ -256,11 +502,32 @@ def merge_contacts(contacts_db: dict[str, dict[str, str|dict]], contact_id1: str
     contact1 = contacts_db[contact_id1]
     contact2 = contacts_db[contact_id2]
     
-    merged_contact = merge_dict(contact1, contact2, ['created_date', 'last_modified']) # time keys handeled by add_contact
+    merged_contact = merge_dict(contact1, contact2, ['created_date', 'last_modified'], resolve=resolve) # time keys handeled by add_contact
     
-    return add_contact(contacts_db, merged_contact)
+    return insert_contact(contacts_db, merged_contact, op='merge', merged_from=[contact_id1, contact_id2])
 
 
+def cached_search(kind: str):
+    """
+    Decorator for the search functions: when contacts_db has a search_cache
+    (a contact_cache.SearchCache) repeated searches are answered from it.
+    """
+    def decorator(search):
+        signature = inspect.signature(search)
+        
+        @functools.wraps(search)
+        def cached(contacts_db, *args, **kwargs):
+            search_cache = getattr(contacts_db, 'search_cache', None)
+            if search_cache is None:
+                return search(contacts_db, *args, **kwargs)
+            bound = signature.bind(contacts_db, *args, **kwargs)
+            bound.apply_defaults()
+            return search_cache.get(kind, bound.args[1:], lambda: search(contacts_db, *args, **kwargs))
+        return cached
+    return decorator
+
+
+@cached_search('name')
 def search_contacts_by_name(contacts_db: dict[str, str|dict], search_term: str):
     """
     Search contacts by first or last name (case-insensitive partial match).
@@ -270,6 +537,9 @@ def search_contacts_by_name(contacts_db: dict[str, str|dict], search_term: str):
     Returns:
     dict: Dictionary of matching contacts {contact_id: contact_data}
     """
+    if hasattr(contacts_db, 'search_name'): # indexed db, skip the full scan
+        return contacts_db.search_name(search_term)
+    
     result_db = {}
     for contact_id, contact in contacts_db.items():
         name = contact['first_name'] + ' ' + contact['last_name']
@@ -279,6 +549,61 @@ def search_contacts_by_name(contacts_db: dict[str, str|dict], search_term: str):
     return result_db
 
 
+@cached_search('name_prefix')
+def search_contacts_by_name_prefix(contacts_db: dict[str, str|dict], prefix: str):
+    """
+    Search contacts whose first or last name starts with prefix (case-insensitive).
+    Args:
+    contacts_db (dict): The main contacts database
+    prefix (str): Start of the name to search for
+    Returns:
+    dict: Dictionary of matching contacts {contact_id: contact_data}
+    """
+    if hasattr(contacts_db, 'search_name_prefix'):
+        return contacts_db.search_name_prefix(prefix)
+    
+    prefix = prefix.lower()
+    result_db = {}
+    for contact_id, contact in contacts_db.items():
+        if contact['first_name'].lower().startswith(prefix) or contact['last_name'].lower().startswith(prefix):
+            result_db[contact_id] = contact
+    
+    return result_db
+
+
+@cached_search('fuzzy_name')
+def fuzzy_search_contacts_by_name(contacts_db: dict[str, str|dict], search_term: str, limit: int = 10, min_score: float = 0.0):
+    """
+    Search contacts by name allowing typos, ranked by similarity
+    (trigram overlap of 'first last', see contact_index.name_similarity).
+    Args:
+    contacts_db (dict): The main contacts database
+    search_term (str): Name to search for
+    limit (int): Max number of contacts to return
+    min_score (float): Minimum similarity (0 to 1) to be included
+    Returns:
+    dict: Up to limit matching contacts {contact_id: contact_data}, best match first
+    """
+    if hasattr(contacts_db, 'fuzzy_search_name'):
+        return contacts_db.fuzzy_search_name(search_term, limit, min_score)
+    
+    if len(search_term) < NAME_GRAM_SIZE: # too short for trigrams
+        return dict(list(search_contacts_by_name(contacts_db, search_term).items())[:limit])
+    
+    term_grams = padded_name_grams(search_term.lower())
+    scored = []
+    for contact_id, contact in contacts_db.items():
+        name = (contact['first_name'] + ' ' + contact['last_name']).lower()
+        shared = len(term_grams & padded_name_grams(name))
+        score = name_similarity(term_grams, name, shared)
+        if shared and score >= min_score:
+            scored.append((contact_id, score))
+    
+    best = heapq.nlargest(limit, scored, key=lambda item: item[1]) # stable, ties stay in db order
+    return {contact_id: contacts_db[contact_id] for contact_id, _ in best}
+
+
+@cached_search('category')
 def search_contacts_by_category(contacts_db: dict[str, str|dict], category: str):
     """
     Find all contacts in a specific category.
@@ -288,6 +613,9 @@ def search_contacts_by_category(contacts_db: dict[str, str|dict], category: str)
     Returns:
     dict: Dictionary of matching contacts
     """
+    if hasattr(contacts_db, 'search_category'):
+        return contacts_db.search_category(category)
+    
     result_db = {}
     for contact_id, contact in contacts_db.items():
         if category == contact['category']:
@@ -296,6 +624,7 @@ def search_contacts_by_category(contacts_db: dict[str, str|dict], category: str)
     return result_db
 
 
+@cached_search('phone')
 def find_contact_by_phone(contacts_db: dict[str, str|dict], phone_number: str):
     """
     Find contact by phone number (exact match).
@@ -305,6 +634,9 @@ def find_contact_by_phone(contacts_db: dict[str, str|dict], phone_number: str):
     Returns:
     tuple: (contact_id, contact_data) if found, (None, None) if not found
     """
+    if hasattr(contacts_db, 'find_phone'):
+        return contacts_db.find_phone(phone_number)
+    
     for contact_id, contact in contacts_db.items():
         if phone_number == contact['phone']:
             return contact_id, contact
@@ -312,6 +644,31 @@ def find_contact_by_phone(contacts_db: dict[str, str|dict], phone_number: str):
     return None, None
 
 
+CSV_ENCODING = 'utf-8' # explicit so a file reads back the same under any locale
+CSV_HEADER = ['id', 'first_name', 'last_name', 'phone', 'email', 'addr_street', 'addr_city', 'addr_state', 'addr_zip', 'category', 'notes', 'created_date', 'last_modified']
+
+
+def contact_to_row(contact_id: str, contact: dict[str, str|dict]) -> list[str]:
+    """
+    Build one csv row (in CSV_HEADER order) from a contact.
+    """
+    return [
+        contact_id,
+        contact['first_name'],
+        contact['last_name'],
+        contact['phone'],
+        contact['email'],
+        contact['address']['street'],
+        contact['address']['city'],
+        contact['address']['state'],
+        contact['address']['zip_code'],
+        contact['category'],
+        contact['notes'],
+        contact['created_date'],
+        contact['last_modified']
+    ]
+
+
 def save_contacts_to_file(contacts_db, filename):
     """
     Save contacts database to a csv file.
@@ -326,65 +683,184 @@ def save_contacts_to_file(contacts_db, filename):
     if not filename.endswith('.csv'):
         filename += '.csv'
     
-    with open(filename, 'w', newline='') as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerow(['id', 'first_name', 'last_name', 'phone', 'email', 'addr_street', 'addr_city', 'addr_state', 'addr_zip', 'category', 'notes', 'created_date', 'last_modified'])
-        for contact_id, contact in contacts_db.items():
-            writer.writerow([
-                contact_id,
-                contact['first_name'],
-                contact['last_name'],
-                contact['phone'],
-                contact['email'],
-                contact['address']['street'],
-                contact['address']['city'],
-                contact['address']['state'],
-                contact['address']['zip_code'],
-                contact['category'],
-                contact['notes'],
-                contact['created_date'],
-                contact['last_modified']
-            ])
+    write_contacts_csv(contacts_db, filename)
     
     print(f"Contacts saved to {filename}")
 
-def load_contacts_from_file(filename):
+
+def write_contacts_csv(contacts_db, filename, sync=False):
+    """
+    Write contacts to a csv file (exact filename, no checks, no printing).
+    Writes to a temp file first and renames it, so the file is never half written.
+    sync also fsyncs the data before the rename.
+    """
+    temp_filename = filename + '.tmp'
+    with open(temp_filename, 'w', newline='', encoding=CSV_ENCODING) as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(CSV_HEADER)
+        for contact_id, contact in contacts_db.items():
+            writer.writerow(contact_to_row(contact_id, contact))
+        if sync:
+            csvfile.flush()
+            os.fsync(csvfile.fileno())
+    os.replace(temp_filename, filename)
+
+
+def export_modified_since(contacts_db: dict[str, dict], filename: str, since: str) -> int:
+    """
+    Write only the contacts added or changed on or after the date since to a csv file
+    (same format as save_contacts_to_file), for incremental sync jobs.
+    Deleted contacts aren't in the file, a change feed (since()) has those.
+
+    Returns:
+        int: Number of contacts exported
+    """
+    if not filename.endswith('.csv'):
+        filename += '.csv'
+    changed = find_contacts_by_date(contacts_db, 'last_modified', start=since)
+    write_contacts_csv(changed, filename)
+    return len(changed)
+
+
+def row_to_contact(row: dict[str, str]) -> dict[str, str|dict]:
+    """
+    Build a contact dict from one csv row (as read by csv.DictReader).
+    """
+    return {
+        'first_name': row['first_name'],
+        'last_name': row['last_name'],
+        'phone': row['phone'],
+        'email': row['email'],
+        'address': {
+            'street': row['addr_street'],
+            'city': row['addr_city'],
+            'state': row['addr_state'],
+            'zip_code': row['addr_zip']
+        },
+        'category': row['category'],
+        'notes': row['notes'],
+        'created_date': row['created_date'],
+        'last_modified': row['last_modified']
+    }
+
+
+def iter_contact_batches(filename: str, batch_size: int = 10000):
+    """
+    Stream contacts from a csv file without building the whole database.
+    Raises FileNotFoundError if the file doesn't exist and ValueError for a row
+    with the wrong number of columns (a cut off or damaged file).
+
+    Args:
+        filename (str): csv file to read (.csv is added if missing)
+        batch_size (int): Max number of contacts per batch
+
+    Yields:
+        dict: Batches of {contact_id: contact_data} in file order
+    """
+    if not filename.endswith('.csv'):
+        filename += '.csv'
+    
+    with open(filename, 'r', newline='', encoding=CSV_ENCODING) as csvfile:
+        batch = {}
+        reader = csv.DictReader(csvfile)
+        for row in reader:
+            if None in row or None in row.values(): # DictReader's fill for extra or missing columns
+                raise ValueError(f'{filename} line {reader.line_num}: expected {len(reader.fieldnames)} columns')
+            batch[row['id']] = row_to_contact(row)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = {}
+        if batch:
+            yield batch
+
+
+def load_contacts_from_file(filename, contacts_db=None, batch_size=10000, on_batch=None):
     """
     Load contacts database from a csv file.
     Return empty dict if file doesn't exist.
+
+    Contacts are streamed in batches, so they can go straight into an existing
+    (e.g. indexed) database and be handed to on_batch as they are read.
+
+    Args:
+        filename (str): csv file to read (.csv is added if missing)
+        contacts_db (dict): Database to load into, a new dict if None
+        batch_size (int): Number of contacts read per batch
+        on_batch (callable): Called with each batch dict after it is added
     """
     # id,first_name,last_name,phone,email,addr_street,addr_city,addr_state,addr_zip,category,notes,created_date,last_modifed
+    if contacts_db is None:
+        contacts_db = {}
     
-    # add .csv to filename if it doesn't already end with it
+    try:
+        for batch in iter_contact_batches(filename, batch_size):
+            contacts_db.update(batch)
+            if on_batch is not None:
+                on_batch(batch)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Error loading contacts from file: {e}")
+    
+    return contacts_db # will be empty if file doesn't exist
+
+
+def _load_csv_range(filename: str, start: int, end: int, header: list[str]) -> dict[str, dict]:
+    # worker for load_contacts_parallel, parses the lines in bytes [start, end)
+    with open(filename, 'rb') as csvfile:
+        csvfile.seek(start)
+        text = csvfile.read(end - start).decode(CSV_ENCODING)
+    
+    contacts_db = {}
+    for values in csv.reader(io.StringIO(text, newline='')):
+        row = dict(zip(header, values))
+        contacts_db[row['id']] = row_to_contact(row)
+    return contacts_db
+
+
+def load_contacts_parallel(filename, workers=4, contacts_db=None):
+    """
+    Load contacts from a csv file using several worker processes.
+    The file is split into byte ranges on line boundaries, each worker parses one
+    range and the partial databases are merged back in file order.
+    Only works for files with one contact per line (no line breaks inside notes),
+    use load_contacts_from_file otherwise.
+
+    Args:
+        filename (str): csv file to read (.csv is added if missing)
+        workers (int): Number of worker processes
+        contacts_db (dict): Database to load into, a new dict if None
+
+    Returns:
+        dict: The loaded database, empty if the file doesn't exist
+    """
     if not filename.endswith('.csv'):
         filename += '.csv'
+    if contacts_db is None:
+        contacts_db = {}
     
-    contacts_db = {}
     try:
-        with open(filename, 'r') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                contact_id = row['id']
-                contact = {
-                    'first_name': row['first_name'],
-                    'last_name': row['last_name'],
-                    'phone': row['phone'],
-                    'email': row['email'],
-                    'address': {
-                        'street': row['addr_street'],
-                        'city': row['addr_city'],
-                        'state': row['addr_state'],
-                        'zip_code': row['addr_zip']
-                    },
-                    'category': row['category'],
-                    'notes': row['notes'],
-                    'created_date': row['created_date'],
-                    'last_modified': row['last_modified']
-                }
-                contacts_db[contact_id] = contact
+        with open(filename, 'rb') as csvfile:
+            header_line = csvfile.readline()
+            data_start = csvfile.tell()
+            file_end = csvfile.seek(0, os.SEEK_END)
+            
+            # pick evenly spaced split points, then move each one to the start of the next line
+            bounds = [data_start]
+            for i in range(1, workers):
+                csvfile.seek(max(data_start + (file_end - data_start) * i // workers, bounds[-1]))
+                csvfile.readline()
+                bounds.append(min(csvfile.tell(), file_end))
+            bounds.append(file_end)
+        
+        header = next(csv.reader([header_line.decode(CSV_ENCODING)]))
+        ranges = [(filename, start, end, header) for start, end in zip(bounds, bounds[1:]) if end > start]
+        with multiprocessing.Pool(workers) as pool:
+            for partial_db in pool.starmap(_load_csv_range, ranges):
+                contacts_db.update(partial_db)
     except FileNotFoundError:
         pass
     except Exception as e:
         print(f"Error loading contacts from file: {e}")
     
-    return contacts_db # will be empty if file doesn't exist
\ No newline at end of file
+    return contacts_db
@@ -0,0 +1,181 @@
+import argparse
+import bisect
+import functools
+import json
+import threading
+import time
+
+import contact_manager as ctdb
+
+# contact_manager functions that get instrumented
+OPERATIONS = [
+    'add_contact', 'bulk_add_contacts', 'update_contact', 'delete_contact', 'merge_contacts',
+    'search_contacts_by_name', 'search_contacts_by_name_prefix', 'fuzzy_search_contacts_by_name',
+    'search_contacts_by_category', 'find_contact_by_phone',
+    'save_contacts_to_file', 'load_contacts_from_file', 'load_contacts_parallel',
+]
+# latency histogram bucket upper bounds in seconds (Prometheus style, plus +Inf)
+LATENCY_BUCKETS = [0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0]
+
+
+def result_size(result) -> int:
+    """
+    How many contacts an operation returned or touched.
+    """
+    if isinstance(result, (dict, list)):
+        return len(result)
+    if isinstance(result, tuple): # (contact_id, contact) from find_contact_by_phone, (ids, rejects) from bulk add
+        return len(result[0]) if isinstance(result[0], list) else int(result[0] is not None)
+    if isinstance(result, bool):
+        return int(result)
+    return int(result is not None)
+
+
+class Metrics:
+    """
+    Per-operation call counts, errors, latency histograms and result sizes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.operations = {}
+
+    def reset(self):
+        with self._lock:
+            self.operations = {}
+
+    def record(self, operation: str, seconds: float, size: int, error: bool = False):
+        with self._lock:
+            stats = self.operations.get(operation)
+            if stats is None:
+                stats = self.operations[operation] = {
+                    'count': 0, 'errors': 0, 'total_seconds': 0.0, 'max_seconds': 0.0,
+                    'buckets': [0] * (len(LATENCY_BUCKETS) + 1), 'result_total': 0, 'result_max': 0
+                }
+            stats['count'] += 1
+            stats['errors'] += error
+            stats['total_seconds'] += seconds
+            stats['max_seconds'] = max(stats['max_seconds'], seconds)
+            stats['buckets'][bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            stats['result_total'] += size
+            stats['result_max'] = max(stats['result_max'], size)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {operation: dict(stats, buckets=list(stats['buckets'])) for operation, stats in self.operations.items()}
+
+    def to_prometheus(self) -> str:
+        """
+        Metrics in the Prometheus text exposition format.
+        """
+        lines = [
+            '# HELP contact_manager_operation_seconds Latency of contact_manager operations.',
+            '# TYPE contact_manager_operation_seconds histogram',
+        ]
+        operations = self.to_dict()
+        for operation, stats in operations.items():
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ['+Inf'], stats['buckets']):
+                cumulative += count
+                lines.append(f'contact_manager_operation_seconds_bucket{{operation="{operation}",le="{bound}"}} {cumulative}')
+            lines.append(f'contact_manager_operation_seconds_sum{{operation="{operation}"}} {stats["total_seconds"]}')
+            lines.append(f'contact_manager_operation_seconds_count{{operation="{operation}"}} {stats["count"]}')
+        for name, key, kind, help_text in (
+            ('errors_total', 'errors', 'counter', 'Operations that raised an exception.'),
+            ('result_size_total', 'result_total', 'counter', 'Contacts returned or touched by operations.'),
+            ('result_size_max', 'result_max', 'gauge', 'Largest result of a single operation.'),
+        ):
+            lines.append(f'# HELP contact_manager_operation_{name} {help_text}')
+            lines.append(f'# TYPE contact_manager_operation_{name} {kind}')
+            for operation, stats in operations.items():
+                lines.append(f'contact_manager_operation_{name}{{operation="{operation}"}} {stats[key]}')
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, filename: str):
+        with open(filename, 'w') as metrics_file:
+            json.dump(self.to_dict(), metrics_file, indent=4)
+
+
+metrics = Metrics()
+_originals = {} # (module, name) -> original function while instrumentation is enabled
+_calls = threading.local() # depth: instrumented calls running in this thread
+
+
+def _instrument(operation: str, function):
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        depth = getattr(_calls, 'depth', 0)
+        if depth: # called by another operation (fuzzy search falling back to search by name), only the outer call counts
+            return function(*args, **kwargs)
+        _calls.depth = depth + 1
+        start = time.perf_counter()
+        try:
+            result = function(*args, **kwargs)
+        except Exception:
+            metrics.record(operation, time.perf_counter() - start, 0, error=True)
+            raise
+        finally:
+            _calls.depth = depth
+        metrics.record(operation, time.perf_counter() - start, result_size(result))
+        return result
+    return wrapper
+
+
+def enable(module=ctdb, operations: list[str] = OPERATIONS):
+    """
+    Start recording metrics for the operations in module.
+    The module functions are swapped for timed wrappers, so while disabled there is no
+    overhead at all. Only calls through the module (ctdb.add_contact(...)) are seen,
+    not names imported with from contact_manager import ... before enabling.
+    Operations called by other operations aren't recorded, their time is in the outer one.
+    """
+    for operation in operations:
+        if (module, operation) not in _originals:
+            function = getattr(module, operation)
+            _originals[(module, operation)] = function
+            setattr(module, operation, _instrument(operation, function))
+
+
+def disable():
+    """
+    Put the original functions back, recorded metrics are kept.
+    """
+    for (module, operation), function in _originals.items():
+        setattr(module, operation, function)
+    _originals.clear()
+
+
+def is_enabled() -> bool:
+    return bool(_originals)
+
+
+def format_report(operations: dict, top: int = 10, sort_by: str = 'total_seconds') -> str:
+    """
+    Table of the top operations (by total time by default) from a to_dict() result.
+    """
+    rows = sorted(operations.items(), key=lambda item: item[1][sort_by], reverse=True)[:top]
+    lines = [f"{'operation':<32}{'count':>10}{'total s':>12}{'avg ms':>10}{'max ms':>10}{'errors':>8}{'avg size':>10}"]
+    lines.append('-' * len(lines[0]))
+    for operation, stats in rows:
+        average_ms = stats['total_seconds'] / stats['count'] * 1000 if stats['count'] else 0
+        average_size = stats['result_total'] / stats['count'] if stats['count'] else 0
+        lines.append(f"{operation:<32}{stats['count']:>10}{stats['total_seconds']:>12.3f}{average_ms:>10.3f}"
+                     f"{stats['max_seconds'] * 1000:>10.3f}{stats['errors']:>8}{average_size:>10.1f}")
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Print the hottest contact_manager operations from a metrics dump")
+    parser.add_argument('filename', help="json file written by metrics.dump()")
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--sort', default='total_seconds', choices=['total_seconds', 'count', 'max_seconds', 'errors', 'result_total'])
+    parser.add_argument('--prometheus', action='store_true', help="print the Prometheus text format instead")
+    options = parser.parse_args()
+
+    with open(options.filename) as metrics_file:
+        loaded = json.load(metrics_file)
+    if options.prometheus:
+        metrics.operations = loaded
+        print(metrics.to_prometheus(), end='')
+    else:
+        print(format_report(loaded, options.top, options.sort))
@@ -0,0 +1,85 @@
+from contact_index import ADDRESS_FIELDS, INDEXED_FIELDS, field_value
+from contact_manager import BLANK_CONTACT
+
+# filters query() understands besides name and name_prefix, all exact matches
+EXACT_FILTERS = tuple(field for field in BLANK_CONTACT if field != 'address') + ADDRESS_FIELDS + ('created_date', 'last_modified')
+
+
+def _matches(contact: dict[str, str|dict], exact: dict[str, str], name: str = None, name_prefix: str = None) -> bool:
+    for field, value in exact.items():
+        if field_value(contact, field) != value:
+            return False
+    if name is not None and name.lower() not in (contact['first_name'] + ' ' + contact['last_name']).lower():
+        return False
+    if name_prefix is not None and not (contact['first_name'].lower().startswith(name_prefix.lower())
+                                        or contact['last_name'].lower().startswith(name_prefix.lower())):
+        return False
+    return True
+
+
+def _candidate_ids(contacts_db, exact: dict[str, str], name: str = None, name_prefix: str = None) -> set[str]|None:
+    """
+    Use the database's indexes to narrow down the ids that can match.
+    Indexed exact filters go first, smallest posting first, and are intersected
+    (each & only costs the size of the smaller set). The name index is only used if
+    no exact filter was indexed, otherwise checking names on the few candidates is cheaper.
+    Returns None if nothing could be narrowed down.
+    """
+    indexed = INDEXED_FIELDS if hasattr(contacts_db, 'ids_for_field') else ()
+    plan = sorted((field for field in exact if field in indexed), key=lambda field: contacts_db.count_for_field(field, exact[field]))
+
+    candidates = None
+    for field in plan:
+        posting = contacts_db.ids_for_field(field, exact[field])
+        candidates = posting if candidates is None else candidates & posting
+        if not candidates:
+            return set()
+
+    if candidates is None and name is not None and hasattr(contacts_db, 'ids_for_name'):
+        candidates = contacts_db.ids_for_name(name)
+    if candidates is None and name_prefix is not None and hasattr(contacts_db, 'ids_for_name_prefix'):
+        candidates = contacts_db.ids_for_name_prefix(name_prefix)
+    return candidates
+
+
+def query(contacts_db: dict[str, dict], limit: int = None, offset: int = 0, name: str = None, name_prefix: str = None, **filters) -> dict[str, dict]:
+    """
+    Find contacts matching every given filter.
+    Example: query(contacts_db, category='work', city='Anytown', name_prefix='He')
+
+    Args:
+        contacts_db (dict): The main contacts database (indexes are used if it's an IndexedContactsDB)
+        limit (int): Max number of contacts to return, None for all
+        offset (int): Number of matching contacts to skip (for paging)
+        name (str): 'first last' contains name (case-insensitive), like search_contacts_by_name
+        name_prefix (str): First or last name starts with name_prefix (case-insensitive)
+        **filters: Exact matches on contact fields (see EXACT_FILTERS), address fields by their own name (city='Anytown')
+
+    Returns:
+        dict: Matching contacts {contact_id: contact_data} in database order
+    """
+    for field in filters:
+        if field not in EXACT_FILTERS:
+            raise ValueError(f'unknown query filter: {field}')
+
+    if hasattr(contacts_db, 'query_contacts'): # sharded db, every shard runs the query itself
+        return contacts_db.query_contacts(limit, offset, name=name, name_prefix=name_prefix, **filters)
+
+    candidates = _candidate_ids(contacts_db, filters, name, name_prefix)
+    if candidates is None:
+        matching_ids = (contact_id for contact_id in contacts_db) # no index helped, scan everything
+    else:
+        matching_ids = contacts_db.in_order(candidates)
+
+    result_db = {}
+    skipped = 0
+    for contact_id in matching_ids:
+        if limit is not None and len(result_db) >= limit:
+            break
+        if _matches(contacts_db[contact_id], filters, name, name_prefix):
+            if skipped < offset:
+                skipped += 1
+            else:
+                result_db[contact_id] = contacts_db[contact_id]
+
+    return result_db
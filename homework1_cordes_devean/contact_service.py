@@ -0,0 +1,254 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import contact_manager as ctdb
+from contact_concurrency import ConcurrentContactsDB
+from contact_dedup import keep_first
+from contact_index import IndexedContactsDB
+
+# Protocol: one json object per line in each direction over a local tcp socket.
+#   request:  {"id": 1, "op": "search_name", "args": {"search_term": "doe"}}
+#   response: {"id": 1, "ok": true, "result": ...} or {"id": 1, "ok": false, "error": "..."}
+READ_OPS = {
+    'get': 'get_contact',                        # contact_id
+    'search_name': 'search_contacts_by_name',    # search_term
+    'search_category': 'search_contacts_by_category', # category
+    'find_phone': 'find_contact_by_phone',       # phone_number
+    'query': 'query',                            # any query() filters
+}
+WRITE_OPS = {
+    'add': 'add_contact',        # contact_data
+    'update': 'update_contact',  # contact_id, field_updates
+    'delete': 'delete_contact',  # contact_id
+    'merge': 'merge_contacts',   # contact_id1, contact_id2, keep ('first' or 'second' wins conflicts)
+}
+
+
+def keep_second(path: str, value1: str, value2: str) -> str:
+    return value2
+
+
+class ContactService:
+    """
+    asyncio front end for a contacts database stored in a csv file.
+
+    - Every operation runs on a worker thread through a ConcurrentContactsDB, so the
+      event loop never blocks and searches can run at the same time.
+    - Identical searches that arrive while one is already running wait for that one
+      instead of running again.
+    - Writes only mark the database dirty, a background task saves it every
+      flush_interval seconds, so a burst of writes costs one save.
+    """
+
+    def __init__(self, filename: str, flush_interval: float = 1.0):
+        self.filename = filename if filename.endswith('.csv') else filename + '.csv'
+        self.flush_interval = flush_interval
+        contacts_db = IndexedContactsDB()
+        try:
+            # errors propagate, the next flush would otherwise save a partly loaded file over the original
+            for batch in ctdb.iter_contact_batches(self.filename):
+                contacts_db.update(batch)
+        except FileNotFoundError:
+            pass
+        self.store = ConcurrentContactsDB(contacts_db)
+        self.stats = {'requests': 0, 'batched_searches': 0, 'flushes': 0, 'flush_errors': 0}
+        self._inflight = {} # (op, args) -> future of a running search
+        self._dirty = False
+        self._server = None
+        self._flush_task = None
+
+    async def run_read(self, op: str, args: dict):
+        key = (op, json.dumps(args, sort_keys=True))
+        if key in self._inflight:
+            self.stats['batched_searches'] += 1
+            return await asyncio.shield(self._inflight[key])
+
+        method = getattr(self.store, READ_OPS[op])
+        future = asyncio.ensure_future(asyncio.to_thread(method, **args))
+        self._inflight[key] = future
+        try:
+            return await asyncio.shield(future)
+        finally:
+            del self._inflight[key]
+
+    async def run_write(self, op: str, args: dict):
+        if op == 'merge':
+            args = dict(args)
+            args['resolve'] = keep_second if args.pop('keep', 'first') == 'second' else keep_first
+        result = await asyncio.to_thread(getattr(self.store, WRITE_OPS[op]), **args)
+        self._dirty = True
+        return result
+
+    async def handle_request(self, request: dict) -> dict:
+        self.stats['requests'] += 1
+        if not isinstance(request, dict): # valid json, but not a request object
+            return {'id': None, 'ok': False, 'error': 'request must be a json object'}
+        op = request.get('op')
+        args = request.get('args', {})
+        try:
+            if not isinstance(args, dict):
+                raise ValueError('args must be a json object')
+            if op in READ_OPS:
+                result = await self.run_read(op, args)
+            elif op in WRITE_OPS:
+                result = await self.run_write(op, args)
+            elif op == 'stats':
+                result = dict(self.stats, contacts=len(self.store))
+            else:
+                raise ValueError(f'unknown op: {op}')
+        except Exception as e:
+            return {'id': request.get('id'), 'ok': False, 'error': f'{type(e).__name__}: {e}'}
+        return {'id': request.get('id'), 'ok': True, 'result': result}
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError:
+                    response = {'id': None, 'ok': False, 'error': 'request is not valid json'}
+                else:
+                    response = await self.handle_request(request)
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def _save(self):
+        # copy under the lock and write outside it, so writers only wait for the copy and not the disk
+        with self.store.lock.read_lock():
+            snapshot = {contact_id: ctdb.copy_contact(contact) for contact_id, contact in self.store.contacts_db.items()}
+        ctdb.write_contacts_csv(snapshot, self.filename)
+
+    async def flush(self):
+        """
+        Save the database if anything changed since the last flush.
+        A failed save leaves the database dirty so the next flush tries again, and raises.
+        """
+        if self._dirty:
+            self._dirty = False # writes that land during the save set it again
+            try:
+                await asyncio.to_thread(self._save)
+            except Exception:
+                self._dirty = True
+                self.stats['flush_errors'] += 1
+                raise
+            self.stats['flushes'] += 1
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e: # keep flushing, the disk may come back
+                print(f"Error saving {self.filename}: {e}")
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8765):
+        self._server = await asyncio.start_server(self.handle_connection, host, port)
+        self._flush_task = asyncio.create_task(self._flush_loop())
+        return self._server
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+        self._flush_task.cancel()
+        try:
+            await self.flush()
+        finally:
+            self.store.close()
+
+
+async def serve(filename: str, host: str, port: int, flush_interval: float):
+    service = ContactService(filename, flush_interval)
+    server = await service.start(host, port)
+    print(f"Serving {service.filename} on {host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+
+
+# --- load generator ---
+
+async def _load_client(host: str, port: int, requests: int, write_ratio: float, seed: int, latencies: list):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    my_ids = []
+    for request_id in range(requests):
+        if rng.random() < write_ratio:
+            if my_ids and rng.random() < 0.5:
+                request = {'op': 'update', 'args': {'contact_id': rng.choice(my_ids), 'field_updates': {'notes': f'load {request_id}'}}}
+            else:
+                request = {'op': 'add', 'args': {'contact_data': ctdb.complete_partial({
+                    'first_name': f'Load{rng.randint(0, 999)}', 'last_name': f'Client{seed}',
+                    'phone': f'555-{rng.randint(0, 999):03d}-{rng.randint(0, 9999):04d}', 'category': 'work'})}}
+        else:
+            request = rng.choice([
+                {'op': 'search_name', 'args': {'search_term': f'load{rng.randint(0, 99)}'}},
+                {'op': 'search_category', 'args': {'category': 'family'}},
+                {'op': 'find_phone', 'args': {'phone_number': f'555-{rng.randint(0, 999):03d}-0000'}},
+            ])
+        request['id'] = request_id
+
+        start = time.perf_counter()
+        writer.write(json.dumps(request).encode() + b'\n')
+        await writer.drain()
+        response = json.loads(await reader.readline())
+        latencies.append(time.perf_counter() - start)
+        if request['op'] == 'add' and response['ok']:
+            my_ids.append(response['result'])
+    writer.close()
+    await writer.wait_closed()
+
+
+async def run_load(host: str = '127.0.0.1', port: int = 8765, clients: int = 10, requests: int = 500, write_ratio: float = 0.1) -> dict:
+    """
+    Send requests from several concurrent clients and measure throughput and latency.
+
+    Returns:
+        dict: requests, seconds, requests_per_second, p50_ms, p99_ms
+    """
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(_load_client(host, port, requests, write_ratio, seed, latencies) for seed in range(clients)))
+    seconds = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'seconds': round(seconds, 3),
+        'requests_per_second': round(len(latencies) / seconds, 1),
+        'p50_ms': round(latencies[len(latencies) // 2] * 1000, 3),
+        'p99_ms': round(latencies[int(len(latencies) * 0.99)] * 1000, 3),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="asyncio contact manager service")
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve_parser = commands.add_parser('serve', help="serve a contacts csv file")
+    serve_parser.add_argument('filename')
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=8765)
+    serve_parser.add_argument('--flush-interval', type=float, default=1.0)
+    load_parser = commands.add_parser('loadgen', help="measure a running service")
+    load_parser.add_argument('--host', default='127.0.0.1')
+    load_parser.add_argument('--port', type=int, default=8765)
+    load_parser.add_argument('--clients', type=int, default=10)
+    load_parser.add_argument('--requests', type=int, default=500, help="requests per client")
+    load_parser.add_argument('--write-ratio', type=float, default=0.1)
+    options = parser.parse_args()
+
+    if options.command == 'serve':
+        try:
+            asyncio.run(serve(options.filename, options.host, options.port, options.flush_interval))
+        except KeyboardInterrupt:
+            pass
+    else:
+        print(json.dumps(asyncio.run(run_load(options.host, options.port, options.clients, options.requests, options.write_ratio)), indent=4))
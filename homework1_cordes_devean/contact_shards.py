@@ -0,0 +1,238 @@
+import heapq
+import json
+import multiprocessing
+import os
+import threading
+import zlib
+from collections.abc import MutableMapping
+
+import contact_manager as ctdb
+from contact_ids import TimeOrderedIdAllocator
+from contact_journal import JournaledContactsDB
+from contact_query import query
+
+
+def shard_for(contact_id: str, num_shards: int) -> int:
+    # crc32 instead of hash(), str hashes change between processes
+    return zlib.crc32(contact_id.encode()) % num_shards
+
+
+def _query_by_id(contacts_db, filters: dict, limit: int|None) -> dict[str, dict]:
+    # the first limit matches by ID (not insertion order), so pages cut from the merged shards are right
+    matches = query(contacts_db, **filters)
+    contact_ids = sorted(matches) if limit is None else heapq.nsmallest(limit, matches)
+    return {contact_id: matches[contact_id] for contact_id in contact_ids}
+
+
+def _check_shard_count(base_filename: str, num_shards: int):
+    # contact IDs are routed by crc32 % num_shards, opening the files with another count would look in the wrong shards
+    meta_filename = f'{base_filename}_shards.json'
+    if os.path.exists(meta_filename):
+        with open(meta_filename) as meta_file:
+            stored = json.load(meta_file)['num_shards']
+        if stored != num_shards:
+            raise ValueError(f'{base_filename} was created with {stored} shards, not {num_shards}')
+    else:
+        with open(meta_filename, 'w') as meta_file:
+            json.dump({'num_shards': num_shards}, meta_file)
+
+
+def _shard_worker(conn, filename: str):
+    """
+    Runs in each shard process: owns one journaled, indexed database and answers
+    (command, args) messages from the coordinator with ('ok', result) or ('error', message).
+    Sends ('ok', None) once the database is open, or ('error', message) and exits if it can't be opened.
+    """
+    try:
+        contacts_db = JournaledContactsDB(filename)
+    except Exception as e:
+        conn.send(('error', repr(e)))
+        return
+    conn.send(('ok', None))
+    commands = {
+        'get': lambda contact_id: contacts_db.get(contact_id),
+        'set': contacts_db.__setitem__,
+        'delete': lambda contact_id: contacts_db.pop(contact_id, None) is not None,
+        'contains': contacts_db.__contains__,
+        'len': contacts_db.__len__,
+        'ids': lambda: list(contacts_db),
+        'items': lambda: list(contacts_db.items()),
+        'search_name': lambda search_term: ctdb.search_contacts_by_name(contacts_db, search_term),
+        'search_name_prefix': lambda prefix: ctdb.search_contacts_by_name_prefix(contacts_db, prefix),
+        'search_category': lambda category: ctdb.search_contacts_by_category(contacts_db, category),
+        'find_phone': lambda phone_number: ctdb.find_contact_by_phone(contacts_db, phone_number),
+        'query': lambda filters, limit: _query_by_id(contacts_db, filters, limit),
+        'compact': contacts_db.compact,
+    }
+    while True:
+        command, args = conn.recv()
+        if command == 'close':
+            contacts_db.compact()
+            contacts_db.close()
+            conn.send(('ok', None))
+            break
+        try:
+            conn.send(('ok', commands[command](*args)))
+        except Exception as e:
+            conn.send(('error', f'{type(e).__name__}: {e}'))
+
+
+class ShardedContactsDB(MutableMapping):
+    """
+    Contacts database hash-partitioned by contact ID across worker processes.
+    Each shard process has its own indexed database persisted to <base>_shard<i>.csv
+    (plus its journal log), the shard count is kept in <base>_shards.json and reopening
+    with a different one raises ValueError. Opening waits until every shard has loaded its files
+    and raises RuntimeError (stopping the other workers) if one can't. Single-contact operations go to the shard that owns the ID,
+    searches are sent to every shard at once and the results merged.
+
+    It behaves like the normal contact_id -> contact dict, so every contact_manager
+    function works on it. New IDs are time ordered, so merged results sorted by ID come
+    out in insertion order.
+    """
+
+    def __init__(self, base_filename: str, num_shards: int = 4):
+        _check_shard_count(base_filename, num_shards)
+        self.num_shards = num_shards
+        self.id_allocator = TimeOrderedIdAllocator() # picked up by add_contact
+        self._conns = []
+        self._locks = [threading.Lock() for _ in range(num_shards)]
+        self._processes = []
+        for shard in range(num_shards):
+            parent_conn, child_conn = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_shard_worker, args=(child_conn, f'{base_filename}_shard{shard}.csv'), daemon=True)
+            process.start()
+            self._conns.append(parent_conn)
+            self._processes.append(process)
+
+        # wait until every shard has opened its files, so a bad shard fails here and not on first use
+        errors = []
+        for shard in range(num_shards):
+            status, result = self._recv_reply(shard)
+            if status == 'error':
+                errors.append(f'shard {shard}: {result}')
+        if errors:
+            self._terminate()
+            raise RuntimeError('; '.join(errors))
+
+    def _terminate(self):
+        for process in self._processes:
+            process.terminate()
+            process.join()
+        self._processes = []
+
+    def _recv_reply(self, shard: int) -> tuple:
+        # a worker that died answers with an error instead of leaving the pipe broken for the caller
+        try:
+            return self._conns[shard].recv()
+        except (EOFError, ConnectionResetError):
+            return 'error', 'worker process exited'
+
+    def _receive(self, shard: int):
+        status, result = self._recv_reply(shard)
+        if status == 'error':
+            raise RuntimeError(f'shard {shard}: {result}')
+        return result
+
+    def _call(self, shard: int, command: str, *args):
+        with self._locks[shard]:
+            self._conns[shard].send((command, args))
+            return self._receive(shard)
+
+    def _call_all(self, command: str, *args) -> list:
+        # send to every shard before waiting, so they all work at the same time
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            replies = [None] * self.num_shards
+            sent = []
+            for shard, conn in enumerate(self._conns):
+                try:
+                    conn.send((command, args))
+                    sent.append(shard)
+                except (BrokenPipeError, ConnectionResetError):
+                    replies[shard] = ('error', 'worker process exited')
+            # read every reply before raising, a reply left in a pipe would be taken as the answer to the next call
+            for shard in sent:
+                replies[shard] = self._recv_reply(shard)
+            for shard, (status, result) in enumerate(replies):
+                if status == 'error':
+                    raise RuntimeError(f'shard {shard}: {result}')
+            return [result for status, result in replies]
+        finally:
+            for lock in self._locks:
+                lock.release()
+
+    def _merge(self, results: list[dict]) -> dict[str, dict]:
+        merged = {}
+        for result in results:
+            merged.update(result)
+        return {contact_id: merged[contact_id] for contact_id in sorted(merged)}
+
+    # --- dict interface ---
+
+    def __getitem__(self, contact_id):
+        contact = self._call(shard_for(contact_id, self.num_shards), 'get', contact_id)
+        if contact is None:
+            raise KeyError(contact_id)
+        return contact
+
+    def __setitem__(self, contact_id, contact):
+        self._call(shard_for(contact_id, self.num_shards), 'set', contact_id, contact)
+
+    def __delitem__(self, contact_id):
+        if not self._call(shard_for(contact_id, self.num_shards), 'delete', contact_id):
+            raise KeyError(contact_id)
+
+    def __contains__(self, contact_id):
+        return self._call(shard_for(contact_id, self.num_shards), 'contains', contact_id)
+
+    def __iter__(self):
+        return iter(sorted(contact_id for ids in self._call_all('ids') for contact_id in ids))
+
+    def __len__(self):
+        return sum(self._call_all('len'))
+
+    def items(self):
+        return self._merge(dict(items) for items in self._call_all('items')).items()
+
+    # --- searches used by contact_manager and contact_query ---
+
+    def search_name(self, search_term: str) -> dict[str, dict]:
+        return self._merge(self._call_all('search_name', search_term))
+
+    def search_name_prefix(self, prefix: str) -> dict[str, dict]:
+        return self._merge(self._call_all('search_name_prefix', prefix))
+
+    def search_category(self, category: str) -> dict[str, dict]:
+        return self._merge(self._call_all('search_category', category))
+
+    def find_phone(self, phone_number: str) -> tuple:
+        found = [result for result in self._call_all('find_phone', phone_number) if result[0] is not None]
+        return min(found) if found else (None, None)
+
+    def query_contacts(self, limit: int = None, offset: int = 0, **filters) -> dict[str, dict]:
+        # every shard returns its first limit + offset matches by ID, the global page is cut from those
+        shard_limit = None if limit is None else limit + offset
+        merged = self._merge(self._call_all('query', filters, shard_limit))
+        page = list(merged.items())[offset:None if limit is None else offset + limit]
+        return dict(page)
+
+    def compact(self):
+        self._call_all('compact')
+
+    def close(self):
+        """
+        Compact every shard's journal and stop the worker processes.
+        """
+        if self._processes:
+            try:
+                self._call_all('close')
+            finally:
+                self._terminate() # workers that closed have exited already
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
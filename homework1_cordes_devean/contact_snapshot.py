@@ -0,0 +1,195 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import ItemsView, MutableMapping
+
+import contact_manager as ctdb
+
+# File layout (all numbers in the byte order of the machine that wrote it, see the header):
+#   header      32 bytes: magic, byte order, row count, column count, string count
+#   offsets     (string count + 1) uint64, string i is blob[offsets[i]:offsets[i + 1]]
+#   columns     column count * row count uint32 string numbers, one column after the other (CSV_HEADER order)
+#   blob        utf-8 bytes of every distinct string
+MAGIC = b'CTDBSNAP'
+HEADER = struct.Struct('<8sBxxxQII4x')
+BYTE_ORDERS = {'little': 0, 'big': 1}
+
+
+def save_contacts_snapshot(contacts_db: dict[str, dict], filename: str):
+    """
+    Save contacts database to a binary snapshot file (see the layout above).
+    Every distinct string is stored once, so repeated values (categories, dates, cities)
+    cost 4 bytes per contact. The file is written to a temp file and renamed.
+
+    Args:
+        contacts_db (dict): The main contacts database (complete contacts)
+        filename (str): Snapshot file to write
+    """
+    string_numbers = {}
+    columns = [array('I') for _ in ctdb.CSV_HEADER]
+    for contact_id, contact in contacts_db.items():
+        for column, value in zip(columns, ctdb.contact_to_row(contact_id, contact)):
+            if value not in string_numbers:
+                string_numbers[value] = len(string_numbers)
+            column.append(string_numbers[value])
+
+    offsets = array('Q', [0])
+    encoded_strings = []
+    for string in string_numbers: # dicts keep insertion order, so this is string number order
+        encoded = string.encode('utf-8')
+        encoded_strings.append(encoded)
+        offsets.append(offsets[-1] + len(encoded))
+
+    temp_filename = filename + '.tmp'
+    with open(temp_filename, 'wb') as snapshot:
+        snapshot.write(HEADER.pack(MAGIC, BYTE_ORDERS[sys.byteorder], len(contacts_db), len(columns), len(string_numbers)))
+        offsets.tofile(snapshot)
+        for column in columns:
+            column.tofile(snapshot)
+        snapshot.write(b''.join(encoded_strings))
+    os.replace(temp_filename, filename)
+
+
+def load_contacts_snapshot(filename: str):
+    """
+    Open a snapshot written by save_contacts_snapshot.
+    The file is memory mapped, nothing is decoded until a contact is read.
+
+    Returns:
+        SnapshotContactsDB: The contacts database
+    """
+    return SnapshotContactsDB(filename)
+
+
+class SnapshotItemsView(ItemsView):
+    """
+    items() of a SnapshotContactsDB, iterating it decodes rows in order (see iter_items).
+    """
+
+    def __iter__(self):
+        return self._mapping.iter_items()
+
+
+class SnapshotContactsDB(MutableMapping):
+    """
+    Contacts database backed by a memory mapped snapshot file.
+    Contacts are decoded from the file when they are read. Adds, updates and deletes
+    are kept in memory on top of the snapshot (save_contacts_snapshot writes a new one),
+    so all contact_manager functions work on it.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        with open(filename, 'rb') as snapshot:
+            self._mmap = mmap.mmap(snapshot.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, byte_order, self._row_count, column_count, string_count = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f'{filename} is not a contacts snapshot')
+        if byte_order != BYTE_ORDERS[sys.byteorder]:
+            raise ValueError(f'{filename} was written on a machine with a different byte order')
+        if column_count != len(ctdb.CSV_HEADER):
+            raise ValueError(f'{filename} has {column_count} columns, expected {len(ctdb.CSV_HEADER)}')
+
+        view = memoryview(self._mmap)
+        offsets_start = HEADER.size
+        columns_start = offsets_start + (string_count + 1) * 8
+        blob_start = columns_start + column_count * self._row_count * 4
+        self._offsets = view[offsets_start:columns_start].cast('Q')
+        self._columns = [view[columns_start + i * self._row_count * 4:columns_start + (i + 1) * self._row_count * 4].cast('I')
+                         for i in range(column_count)]
+        self._blob = view[blob_start:]
+
+        self._row_of = None  # contact_id -> row, built the first time an id is looked up
+        self._changed = {}   # contacts added or updated since the snapshot was written
+        self._deleted = set()
+
+    def _string(self, number: int) -> str:
+        return str(self._blob[self._offsets[number]:self._offsets[number + 1]], 'utf-8')
+
+    def _row_id(self, row: int) -> str:
+        return self._string(self._columns[0][row])
+
+    def _rows(self) -> dict[str, int]:
+        if self._row_of is None:
+            self._row_of = {self._row_id(row): row for row in range(self._row_count)}
+        return self._row_of
+
+    def _decode_row(self, row: int) -> dict[str, str|dict]:
+        values = dict(zip(ctdb.CSV_HEADER, (self._string(column[row]) for column in self._columns)))
+        return ctdb.row_to_contact(values)
+
+    def __getitem__(self, contact_id):
+        if contact_id in self._changed:
+            return self._changed[contact_id]
+        if contact_id in self._deleted:
+            raise KeyError(contact_id)
+        return self._decode_row(self._rows()[contact_id])
+
+    def __setitem__(self, contact_id, contact):
+        self._deleted.discard(contact_id)
+        self._changed[contact_id] = contact
+
+    def __delitem__(self, contact_id):
+        if contact_id not in self:
+            raise KeyError(contact_id)
+        self._changed.pop(contact_id, None)
+        if contact_id in self._rows():
+            self._deleted.add(contact_id)
+
+    def __contains__(self, contact_id):
+        if contact_id in self._changed:
+            return True
+        return contact_id not in self._deleted and contact_id in self._rows()
+
+    def __iter__(self):
+        # snapshot order first (updated contacts keep their place), then new contacts
+        for row in range(self._row_count):
+            contact_id = self._row_id(row)
+            if contact_id not in self._deleted:
+                yield contact_id
+        for contact_id in self._changed:
+            if contact_id not in self._rows():
+                yield contact_id
+
+    def __len__(self):
+        new_contacts = sum(1 for contact_id in self._changed if contact_id not in self._rows())
+        return self._row_count - len(self._deleted) + new_contacts
+
+    def items(self):
+        return SnapshotItemsView(self)
+
+    def iter_items(self):
+        """
+        (contact_id, contact) pairs, rows are decoded in order instead of looking every id up again.
+        """
+        for row in range(self._row_count):
+            contact_id = self._row_id(row)
+            if contact_id in self._changed:
+                yield contact_id, self._changed[contact_id]
+            elif contact_id not in self._deleted:
+                yield contact_id, self._decode_row(row)
+        for contact_id, contact in self._changed.items():
+            if contact_id not in self._rows():
+                yield contact_id, contact
+
+    def close(self):
+        """
+        Unmap the snapshot file, the database can't be used afterwards.
+        """
+        self._offsets.release()
+        for column in self._columns:
+            column.release()
+        self._blob.release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __repr__(self):
+        return f"SnapshotContactsDB({self.filename!r}, {len(self)} contacts)"
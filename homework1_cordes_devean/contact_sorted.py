@@ -0,0 +1,209 @@
+import bisect
+import json
+import threading
+
+from contact_changes import ChangeFeed
+
+# sort_by -> fields the sort key is built from, ties are broken by contact ID
+SORT_FIELDS = {
+    'last_name': ('last_name', 'first_name'),
+    'first_name': ('first_name', 'last_name'),
+    'created_date': ('created_date',),
+    'last_modified': ('last_modified',),
+}
+DATE_FIELDS = ('created_date', 'last_modified')
+BUCKET_SIZE = 1000
+
+
+def check_sort_by(sort_by: str):
+    if sort_by not in SORT_FIELDS:
+        raise ValueError(f'cannot sort by {sort_by}, use one of {", ".join(SORT_FIELDS)}')
+
+
+def sort_key(sort_by: str, contact_id: str, contact: dict[str, str|dict]) -> tuple:
+    check_sort_by(sort_by)
+    if sort_by in ('last_name', 'first_name'): # names sort case-insensitively
+        return tuple(contact[field].lower() for field in SORT_FIELDS[sort_by]) + (contact_id,)
+    return tuple(contact[field] for field in SORT_FIELDS[sort_by]) + (contact_id,)
+
+
+def encode_cursor(key: tuple) -> str:
+    return json.dumps(list(key))
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        key = json.loads(cursor)
+    except json.JSONDecodeError:
+        raise ValueError('invalid cursor') from None
+    if not isinstance(key, list) or not all(isinstance(part, str) for part in key):
+        raise ValueError('invalid cursor')
+    return tuple(key)
+
+
+class SortedKeyList:
+    """
+    Sorted list of unique keys kept in buckets of up to 2 * BUCKET_SIZE.
+    Adding or removing a key costs O(log N + BUCKET_SIZE) instead of O(N) for one big
+    sorted list, and iterating from any key starts after a binary search.
+    """
+
+    def __init__(self, keys=()):
+        keys = sorted(keys)
+        self._buckets = [keys[i:i + BUCKET_SIZE] for i in range(0, len(keys), BUCKET_SIZE)]
+        self._maxes = [bucket[-1] for bucket in self._buckets]
+        self._len = len(keys)
+
+    def __len__(self):
+        return self._len
+
+    def add(self, key):
+        if not self._buckets:
+            self._buckets.append([key])
+            self._maxes.append(key)
+        else:
+            i = min(bisect.bisect_left(self._maxes, key), len(self._buckets) - 1)
+            bucket = self._buckets[i]
+            bisect.insort(bucket, key)
+            self._maxes[i] = bucket[-1]
+            if len(bucket) > 2 * BUCKET_SIZE: # split so inserts stay cheap
+                self._buckets[i:i + 1] = [bucket[:BUCKET_SIZE], bucket[BUCKET_SIZE:]]
+                self._maxes[i:i + 1] = [bucket[BUCKET_SIZE - 1], bucket[-1]]
+        self._len += 1
+
+    def remove(self, key):
+        i = bisect.bisect_left(self._maxes, key)
+        if i == len(self._buckets):
+            raise KeyError(key)
+        bucket = self._buckets[i]
+        j = bisect.bisect_left(bucket, key)
+        if bucket[j] != key:
+            raise KeyError(key)
+        del bucket[j]
+        if bucket:
+            self._maxes[i] = bucket[-1]
+        else:
+            del self._buckets[i]
+            del self._maxes[i]
+        self._len -= 1
+
+    def after(self, key=None):
+        """
+        Keys greater than key in ascending order (all keys if key is None).
+        """
+        if key is None:
+            i = j = 0
+        else:
+            i = bisect.bisect_right(self._maxes, key)
+            j = bisect.bisect_right(self._buckets[i], key) if i < len(self._buckets) else 0
+        for i in range(i, len(self._buckets)):
+            bucket = self._buckets[i]
+            for j in range(j, len(bucket)):
+                yield bucket[j]
+            j = 0
+
+    def before(self, key=None):
+        """
+        Keys less than key in descending order (all keys if key is None).
+        """
+        i = len(self._buckets) - 1 if key is None else bisect.bisect_left(self._maxes, key)
+        if i == len(self._buckets):
+            i -= 1
+        if i < 0:
+            return
+        j = len(self._buckets[i]) if key is None else bisect.bisect_left(self._buckets[i], key)
+        for i in range(i, -1, -1):
+            bucket = self._buckets[i]
+            for j in range(j - 1, -1, -1):
+                yield bucket[j]
+            j = len(self._buckets[i - 1]) if i else 0
+
+
+class SortedContactIndex:
+    """
+    Sorted views of a contacts database for paging through it in name or date order.
+    attach(contacts_db) sets contacts_db.sorted_index, which list_contacts_sorted uses.
+    A view is only built the first time its sort order is asked for, after that it is
+    kept up to date from the database's change feed (one is attached if it doesn't have
+    one), so a page costs O(log N + limit) instead of a sort of the whole database.
+    Writes that go straight to contacts_db[contact_id] bypass the feed, call rebuild() after those.
+    """
+
+    def __init__(self):
+        self.contacts_db = None
+        self._lock = threading.Lock()
+        self._lists = {} # sort_by -> SortedKeyList
+        self._keys = {}  # sort_by -> {contact_id: its key in the list}
+
+    def attach(self, contacts_db):
+        if getattr(contacts_db, 'change_feed', None) is None:
+            contacts_db.change_feed = ChangeFeed()
+        self.contacts_db = contacts_db
+        contacts_db.sorted_index = self
+        contacts_db.change_feed.subscribe(self.on_change, on_error=lambda event, exception: self.rebuild())
+        return self
+
+    def rebuild(self):
+        with self._lock:
+            self._lists.clear()
+            self._keys.clear()
+
+    def sorted_list(self, sort_by: str) -> SortedKeyList:
+        # build on first use, callers hold the lock
+        check_sort_by(sort_by) # before caching, an empty database would never call sort_key
+        if sort_by not in self._lists:
+            keys = {contact_id: sort_key(sort_by, contact_id, contact) for contact_id, contact in self.contacts_db.items()}
+            self._lists[sort_by] = SortedKeyList(keys.values())
+            self._keys[sort_by] = keys
+        return self._lists[sort_by]
+
+    def on_change(self, event: dict):
+        """
+        Change feed callback, moves the changed contact in every view built so far.
+        """
+        contact_id = event['contact_id']
+        changed_fields = set(event['changes'])
+        contact = self.contacts_db.get(contact_id) if event['op'] != 'delete' else None
+        with self._lock:
+            for sort_by, sorted_list in self._lists.items():
+                keys = self._keys[sort_by]
+                if contact_id in keys and contact is not None and not changed_fields.intersection(SORT_FIELDS[sort_by]):
+                    continue # key didn't change
+                if contact_id in keys:
+                    sorted_list.remove(keys.pop(contact_id))
+                if contact is not None:
+                    keys[contact_id] = sort_key(sort_by, contact_id, contact)
+                    sorted_list.add(keys[contact_id])
+
+    def page(self, sort_by: str, limit: int = 50, cursor: str = None, descending: bool = False) -> tuple[list[str], str|None]:
+        """
+        Returns:
+            tuple: (up to limit contact IDs in order, cursor for the next page or None on the last page)
+        """
+        check_sort_by(sort_by)
+        after = None if cursor is None else decode_cursor(cursor)
+        with self._lock:
+            sorted_list = self.sorted_list(sort_by)
+            keys = sorted_list.before(after) if descending else sorted_list.after(after)
+            page_keys = []
+            for key in keys:
+                if len(page_keys) == limit:
+                    return [key[-1] for key in page_keys], encode_cursor(page_keys[-1])
+                page_keys.append(key)
+        return [key[-1] for key in page_keys], None
+
+    def date_range(self, field: str, start: str = None, end: str = None) -> list[str]:
+        """
+        IDs of the contacts with start <= field < end in date order (either bound can be None),
+        field is created_date or last_modified.
+        """
+        if field not in DATE_FIELDS:
+            raise ValueError(f'{field} is not a date field, use one of {", ".join(DATE_FIELDS)}')
+        with self._lock:
+            sorted_list = self.sorted_list(field)
+            contact_ids = []
+            for key in sorted_list.after(None if start is None else (start,)): # (start,) sorts before every (start, id)
+                if end is not None and key[0] >= end:
+                    break
+                contact_ids.append(key[-1])
+            return contact_ids
@@ -0,0 +1,115 @@
+import re
+
+try:
+    import numpy as np
+except ImportError: # batch validation still works, just returns lists
+    np = None
+
+# compiled once, used with fullmatch (the whole value has to match)
+PHONE_PATTERN = re.compile(r'\d{3}-\d{3}-\d{4}')
+EMAIL_PATTERN = re.compile(r'[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]+')
+ZIP_PATTERN = re.compile(r'\d{5}(?:-\d{4})?')
+STATE_PATTERN = re.compile(r'[A-Z]{2}')
+CATEGORIES = ('', 'personal', 'work', 'family')
+
+REQUIRED_FIELDS = ('first_name', 'last_name', 'phone')
+
+# field -> (check, error code), optional fields may also be blank
+FIELD_CHECKS = {
+    'phone': (PHONE_PATTERN.fullmatch, 'bad_phone'),
+    'email': (EMAIL_PATTERN.fullmatch, 'bad_email'),
+    'zip_code': (ZIP_PATTERN.fullmatch, 'bad_zip'),
+    'state': (STATE_PATTERN.fullmatch, 'bad_state'),
+    'category': (CATEGORIES.__contains__, 'bad_category'),
+}
+
+
+def check_value(field: str, value) -> str|None:
+    """
+    Error code for one field value, None if it's fine.
+    Codes: missing_<field>, wrong_type_<field>, bad_phone, bad_email, bad_zip, bad_state, bad_category
+    """
+    if type(value) is not str:
+        return 'wrong_type_' + field
+    if value == '':
+        return 'missing_' + field if field in REQUIRED_FIELDS else None
+    if field in FIELD_CHECKS:
+        check, error_code = FIELD_CHECKS[field]
+        if not check(value):
+            return error_code
+    return None
+
+
+def validate_contact(contact: dict[str, str|dict]) -> list[str]:
+    """
+    Check one contact (address fields are looked up in contact['address']).
+
+    Returns:
+        list: Error codes, empty if the contact is valid
+    """
+    address = contact.get('address', {})
+    if not isinstance(address, dict):
+        return ['wrong_type_address']
+
+    errors = []
+    for field in REQUIRED_FIELDS + ('email', 'category', 'notes'):
+        error_code = check_value(field, contact.get(field, ''))
+        if error_code:
+            errors.append(error_code)
+    for field in ('street', 'city', 'state', 'zip_code'):
+        error_code = check_value(field, address.get(field, ''))
+        if error_code:
+            errors.append(error_code)
+    return errors
+
+
+def _check_column(field: str, column) -> list:
+    # every distinct value is only checked once, imports repeat states, zips, categories a lot
+    if np is not None and isinstance(column, np.ndarray):
+        # only strings go through np.unique, anything else in an object array (numbers, None, lists) is the wrong type
+        if column.dtype.kind == 'U':
+            is_str = np.ones(len(column), dtype=bool)
+        else:
+            is_str = np.fromiter((type(value) is str for value in column), dtype=bool, count=len(column))
+        errors = np.full(len(column), 'wrong_type_' + field, dtype=object)
+        if is_str.any():
+            distinct, inverse = np.unique(column[is_str].astype(str), return_inverse=True)
+            distinct_errors = np.array([check_value(field, str(value)) for value in distinct], dtype=object) # str(), the values are np.str_
+            errors[is_str] = distinct_errors[inverse.ravel()]
+        return list(errors)
+
+    checked = {}
+    errors = []
+    for value in column:
+        if type(value) is not str: # don't hash it, it may be a list or dict
+            errors.append(check_value(field, value))
+            continue
+        if value not in checked:
+            checked[value] = check_value(field, value)
+        errors.append(checked[value])
+    return errors
+
+
+def validate_columns(columns: dict[str, list]) -> tuple:
+    """
+    Validate a batch of contacts stored column by column, e.g.
+    {'first_name': [...], 'phone': [...], 'zip_code': [...]} (all columns the same length).
+    Columns can be lists or NumPy string arrays, fields without a column aren't checked.
+
+    Returns:
+        tuple: (mask, errors) where mask[i] is True if row i is valid (a NumPy bool array
+        if NumPy is installed) and errors[i] is the list of error codes for row i
+    """
+    row_count = len(next(iter(columns.values()))) if columns else 0
+    errors = [[] for _ in range(row_count)]
+    for field, column in columns.items():
+        if len(column) != row_count:
+            raise ValueError('all columns must have the same length')
+        for row, error_code in enumerate(_check_column(field, column)):
+            if error_code:
+                errors[row].append(error_code)
+
+    mask = [not row_errors for row_errors in errors]
+    if np is not None:
+        mask = np.array(mask, dtype=bool)
+    return mask, errors
@@ -0,0 +1,86 @@
+import random
+import threading
+
+import contact_manager as ctdb
+from contact_concurrency import ConcurrentContactsDB
+
+FIRST_NAMES = ['John', 'Henry', 'Dummy', 'Devean', 'Ann']
+LAST_NAMES = ['Doe', 'Ford', 'One', 'Cordes', 'Lee']
+CATEGORIES = ['personal', 'work', 'family', '']
+
+
+def random_contact(rng: random.Random) -> dict:
+    return ctdb.complete_partial({
+        'first_name': rng.choice(FIRST_NAMES),
+        'last_name': rng.choice(LAST_NAMES),
+        'phone': f'555-{rng.randint(0, 999):03d}-{rng.randint(0, 9999):04d}',
+        'category': rng.choice(CATEGORIES)
+    })
+
+
+def writer(store: ConcurrentContactsDB, seed: int, rounds: int, errors: list):
+    rng = random.Random(seed)
+    my_ids = []
+    try:
+        for _ in range(rounds):
+            action = rng.random()
+            if action < 0.5 or not my_ids:
+                my_ids.append(store.add_contact(random_contact(rng)))
+            elif action < 0.8:
+                store.update_contact(rng.choice(my_ids), {'last_name': rng.choice(LAST_NAMES), 'category': rng.choice(CATEGORIES)})
+            else:
+                store.delete_contact(my_ids.pop(rng.randrange(len(my_ids))))
+    except Exception as e:
+        errors.append(e)
+
+
+def reader(store: ConcurrentContactsDB, seed: int, rounds: int, errors: list):
+    rng = random.Random(seed)
+    try:
+        for _ in range(rounds):
+            name = rng.choice(LAST_NAMES)
+            for contact in store.search_contacts_by_name(name).values(): # results have to really match, no half updates
+                assert name.lower() in (contact['first_name'] + ' ' + contact['last_name']).lower()
+            category = rng.choice(CATEGORIES)
+            for contact in store.search_contacts_by_category(category).values():
+                assert contact['category'] == category
+    except Exception as e:
+        errors.append(e)
+
+
+def test_stress():
+    """
+    Hammer one store with writer and reader threads, then check the indexes still match the data.
+    """
+    store = ConcurrentContactsDB()
+    errors = []
+    threads = [threading.Thread(target=writer, args=(store, seed, 300, errors)) for seed in range(4)]
+    threads += [threading.Thread(target=reader, args=(store, seed, 200, errors)) for seed in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == [], errors
+    assert store.check_indexes()
+    store.close()
+
+
+def test_parallel_search():
+    store = ConcurrentContactsDB()
+    rng = random.Random(1350)
+    for _ in range(200):
+        store.add_contact(random_contact(rng))
+
+    searches = [('search_contacts_by_name', name) for name in LAST_NAMES] + [('search_contacts_by_category', 'work')]
+    results = store.parallel_search(searches)
+    assert results[0] == store.search_contacts_by_name(LAST_NAMES[0])
+    assert results[-1] == store.search_contacts_by_category('work')
+    store.close()
+
+
+if __name__ == '__main__':
+    test_stress()
+    print("Stress test passed")
+    test_parallel_search()
+    print("Parallel search test passed")
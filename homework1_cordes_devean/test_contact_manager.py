@@ -1,5 +1,23 @@
 import contact_manager as ctdb
+from contact_index import IndexedContactsDB
+from contact_columns import ColumnarContactsDB
+from contact_changes import ChangeFeed, apply_change
+from contact_cache import SearchCache
+from contact_sorted import SortedContactIndex
+from contact_journal import JournaledContactsDB
+from contact_snapshot import save_contacts_snapshot, load_contacts_snapshot
+import contact_metrics
+from contact_dedup import find_duplicate_clusters, merge_cluster
+from contact_query import query
+from contact_validation import validate_columns
+from contact_shards import ShardedContactsDB, shard_for
+from bench_contact_manager import generate_contacts
 import time
+import os
+import random
+import tempfile
+import pickle
+import copy
 
 contact_db = {}
 contact1 = {
@@ -124,4 +142,320 @@ print('\n\n\n')
 # EXPORT TEST
 ctdb.save_contacts_to_file(contact_db, 'exported_contacts.csv')
 print('just go check the file idk')
-# END EXPORT TEST
\ No newline at end of file
+# END EXPORT TEST
+
+print('\n\n\n')
+
+# INDEX TEST
+indexed_db = IndexedContactsDB(contact_db) # same contacts, but searches use the indexes
+print(ctdb.search_contacts_by_name(indexed_db, 'dummy') == ctdb.search_contacts_by_name(contact_db, 'dummy')) # True
+print(ctdb.search_contacts_by_name(indexed_db, 'Y O') == ctdb.search_contacts_by_name(contact_db, 'Y O')) # True
+print(ctdb.search_contacts_by_category(indexed_db, 'personal') == ctdb.search_contacts_by_category(contact_db, 'personal')) # True
+print(ctdb.find_contact_by_phone(indexed_db, '555-000-0002') == ctdb.find_contact_by_phone(contact_db, '555-000-0002')) # True
+print(list(ctdb.search_contacts_by_name_prefix(indexed_db, 'tw').keys()) == [dummy2_id]) # True
+
+ctdb.update_contact(indexed_db, dummy2_id, {'last_name': 'Three', 'phone': '555-000-0003'})
+print(list(ctdb.search_contacts_by_name(indexed_db, 'three').keys()) == [dummy2_id]) # True
+print(ctdb.find_contact_by_phone(indexed_db, '555-000-0002')) # None, None tuple
+ctdb.delete_contact(indexed_db, dummy1_id)
+print(ctdb.search_contacts_by_name(indexed_db, 'one')) # {}
+
+indexed_copy = pickle.loads(pickle.dumps(indexed_db))
+print(indexed_copy == indexed_db and list(indexed_copy) == list(indexed_db) and indexed_copy.check_indexes()) # True, indexes rebuilt
+indexed_copy = copy.deepcopy(indexed_db)
+ctdb.delete_contact(indexed_copy, dummy2_id)
+print(type(indexed_copy) is IndexedContactsDB, dummy2_id in indexed_db, indexed_db.check_indexes()) # True True True, the original is untouched
+# END INDEX TEST
+
+print('\n\n\n')
+
+# FUZZY TEST
+print(list(ctdb.fuzzy_search_contacts_by_name(indexed_db, 'jon', limit=1)) == [id1]) # True, short names still match
+print(list(ctdb.fuzzy_search_contacts_by_name(indexed_db, 'jhon', limit=1)) == [id1]) # True, typo
+print(list(ctdb.fuzzy_search_contacts_by_name(indexed_db, 'thre', limit=1)) == [dummy2_id]) # True
+print(ctdb.fuzzy_search_contacts_by_name(indexed_db, 'jhon') == ctdb.fuzzy_search_contacts_by_name(contact_db, 'jhon')) # True, same as without the index
+print(indexed_db.check_indexes()) # True
+
+# a realistic book, every trigram of a generated name is shared by thousands of names
+big_db = IndexedContactsDB((str(i), contact) for i, contact in enumerate(generate_contacts(100000)))
+names = [big_db[str(i)]['first_name'] + ' ' + big_db[str(i)]['last_name'] for i in range(0, 100000, 5000)]
+typos = [name[:len(name) // 2] + name[len(name) // 2 + 1:] for name in names] # one letter dropped
+fuzzy_times = []
+for term in names + typos + ['jhon smith', 'patrica', 'mary']:
+    start = time.perf_counter()
+    big_db.fuzzy_name_ids(term)
+    fuzzy_times.append((time.perf_counter() - start) * 1000)
+print(max(fuzzy_times) < 10) # True, milliseconds per search
+print(all(big_db.fuzzy_name_ids(name, limit=1)[0][1] == 1.0 for name in names)) # True, the exact name comes first
+print(big_db.fuzzy_name_ids(typos[0], limit=1)[0][1] > 0.7) # True
+# END FUZZY TEST
+
+print('\n\n\n')
+
+# ID TEST
+random.seed(1)
+taken_ids = [ctdb.new_contact_id({}) for _ in range(11)] # the next 11 random ids
+full_db = IndexedContactsDB({contact_id: ctdb.complete_partial(dummy1_contact) for contact_id in taken_ids})
+random.seed(1) # so every random id collides
+print(ctdb.add_contact(full_db, dummy2_contact)) # contact_seq_000000001
+print(ctdb.add_contact(full_db, dummy2_contact)) # contact_seq_000000002, counted by the allocator now kept on the db
+# END ID TEST
+
+print('\n\n\n')
+
+# COLUMNAR TEST
+columnar_db = ColumnarContactsDB(sample_db) # same api, stored as columns
+print(dict(columnar_db) == sample_db) # True
+ctdb.update_contact(columnar_db, devean_id, {'notes': 'columnar guy', 'address': {'city': 'Fort Wayne'}})
+ctdb.display_contact(columnar_db, devean_id)
+col_id = ctdb.add_contact(columnar_db, dummy1_contact)
+ctdb.list_all_contacts(columnar_db)
+distinct_strings = len(columnar_db._table)
+ctdb.update_contact(columnar_db, col_id, {'first_name': 'Temporary'})
+ctdb.delete_contact(columnar_db, col_id)
+print(len(columnar_db._table) < distinct_strings) # True, strings only the deleted contact used are freed
+print(dict(columnar_db) == {contact_id: contact for contact_id, contact in columnar_db.items()}) # True
+columnar_count = len(columnar_db)
+try:
+    columnar_db['contact_bad'] = dict(dummy1_contact, notes=['not', 'a', 'str'])
+except TypeError as e:
+    print(e) # notes must be a str, not list
+print('contact_bad' not in columnar_db, len(columnar_db) == columnar_count) # True True
+print(len({len(column) for column in list(columnar_db._coded.values()) + list(columnar_db._text.values())})) # 1, every column still has a value per row
+print(dict(columnar_db) == {contact_id: contact for contact_id, contact in columnar_db.items()}) # True
+# END COLUMNAR TEST
+
+print('\n\n\n')
+
+# BULK TEST
+bulk_ids, bulk_rejects = ctdb.bulk_add_contacts(contact_db, [
+    {'first_name': 'Bulk', 'last_name': 'One', 'phone': '555-100-0001', 'category': 'work'},
+    {'first_name': 'Bulk', 'last_name': 'Two', 'phone': '5551000002'}, # bad phone format
+    {'first_name': 'Bulk', 'phone': '555-100-0003'}, # missing last name
+    {'first_name': 'Bulk', 'last_name': 'Four', 'phone': '555-100-0004', 'address': {'city': 'Anytown'}}
+])
+print(len(bulk_ids)) # 2
+print(bulk_rejects) # rows 1 and 2 with reasons
+ctdb.list_all_contacts(ctdb.search_contacts_by_name(contact_db, 'bulk'))
+lenient_ids, lenient_rejects = ctdb.bulk_add_contacts({}, [
+    {'first_name': 'Bulk', 'last_name': 'Five', 'phone': '555-100-0005', 'email': 'bulk at home', 'address': {'state': 'Indiana', 'zip_code': '4680'}}
+])
+print(len(lenient_ids), lenient_rejects) # 1 [], email, state and zip formats aren't enforced
+column_mask, column_errors = validate_columns({'phone': ['555-100-0001', 5551000002, ['555-100-0003'], 'nope']})
+print([bool(ok) for ok in column_mask], column_errors) # [True, False, False, False] [[], ['wrong_type_phone'], ['wrong_type_phone'], ['bad_phone']]
+# END BULK TEST
+
+print('\n\n\n')
+
+# CHANGE FEED TEST
+feed_db = IndexedContactsDB(sample_db)
+feed_db.change_feed = ChangeFeed()
+feed_replica = dict(sample_db) # gets kept in sync from the feed only
+feed_db.change_feed.subscribe(lambda event: apply_change(feed_replica, event))
+feed_id = ctdb.add_contact(feed_db, dummy2_contact)
+ctdb.update_contact(feed_db, feed_id, {'notes': 'from the feed', 'address': {'state': 'IN'}})
+ctdb.delete_contact(feed_db, devean_id)
+print(feed_db.change_feed.since(1)[0]['changes']) # notes and address.state [old, new]
+print(feed_replica == dict(feed_db)) # True
+broken_subscription = feed_db.change_feed.subscribe(lambda event: event['no such key'])
+ctdb.update_contact(feed_db, feed_id, {'notes': 'broken subscriber'}) # prints the subscriber error, the update still goes through
+print(feed_db.change_feed.failed[broken_subscription]['op']) # update, the broken subscriber was dropped
+print(feed_replica == dict(feed_db)) # True, the other subscribers still got it
+# END CHANGE FEED TEST
+
+print('\n\n\n')
+
+# SEARCH CACHE TEST
+cache_db = IndexedContactsDB(sample_db)
+search_cache = SearchCache(maxsize=100).attach(cache_db)
+ctdb.list_all_contacts(ctdb.search_contacts_by_name(cache_db, 'devean'))
+ctdb.list_all_contacts(ctdb.search_contacts_by_name(cache_db, 'devean')) # from the cache
+cache_id = ctdb.add_contact(cache_db, dummy2_contact)
+ctdb.update_contact(cache_db, cache_id, {'first_name': 'Devean'})
+print(cache_id in ctdb.search_contacts_by_name(cache_db, 'devean')) # True, the update dropped the cached result
+print(search_cache.stats()) # 1 hit, 2 misses
+# END SEARCH CACHE TEST
+
+print('\n\n\n')
+
+# SORTED TEST
+sorted_db = IndexedContactsDB(contact_db)
+SortedContactIndex().attach(sorted_db)
+first_page, cursor = ctdb.list_contacts_sorted(sorted_db, 'last_name', limit=2)
+second_page, cursor = ctdb.list_contacts_sorted(sorted_db, 'last_name', limit=2, cursor=cursor)
+ctdb.list_all_contacts(first_page)
+ctdb.list_all_contacts(second_page)
+print(list(first_page) + list(second_page) == list(ctdb.list_contacts_sorted(contact_db, 'last_name', limit=4)[0])) # True, same order without the index
+ctdb.list_all_contacts(sorted_db, sort_by='created_date')
+empty_sorted_db = SortedContactIndex().attach(IndexedContactsDB()).contacts_db
+try:
+    ctdb.list_contacts_sorted(empty_sorted_db, 'phone')
+except ValueError as e:
+    print(e) # cannot sort by phone
+ctdb.add_contact(empty_sorted_db, dummy2_contact) # the bad sort order wasn't kept, so this still works
+print(len(ctdb.list_contacts_sorted(empty_sorted_db, 'first_name')[0])) # 1
+# END SORTED TEST
+
+print('\n\n\n')
+
+# DATE RANGE TEST
+ctdb.list_all_contacts(ctdb.find_contacts_by_date(sorted_db, 'created_date', start=time.strftime('%Y-%m-%d'))) # everything added today
+print(ctdb.find_contacts_by_date(sorted_db, 'last_modified', end='2000-01-01')) # {}
+print(ctdb.export_modified_since(sorted_db, 'modified_contacts', time.strftime('%Y-%m-%d')) == len(sorted_db)) # True
+# END DATE RANGE TEST
+
+print('\n\n\n')
+
+# JOURNAL TEST
+journal_dir = tempfile.mkdtemp()
+journal_file = os.path.join(journal_dir, 'journal')
+with JournaledContactsDB(journal_file) as journal_db:
+    ctdb.add_contact(journal_db, dummy2_contact)
+with open(journal_file + '.log', 'a') as log: # crash in the middle of writing a record
+    log.write('{"op": "set", "id": "contact_torn", "con')
+with JournaledContactsDB(journal_file) as journal_db:
+    print(len(journal_db)) # 1, the torn record is dropped
+    ctdb.add_contact(journal_db, dummy2_contact)
+    ctdb.add_contact(journal_db, dummy2_contact)
+with JournaledContactsDB(journal_file) as journal_db:
+    print(len(journal_db)) # 3, writes after the crash survive
+with open(journal_file + '.log') as log:
+    log_lines = log.readlines()
+with open(journal_file + '.log', 'w') as log:
+    log.writelines(['not json\n'] + log_lines)
+try:
+    JournaledContactsDB(journal_file)
+except ValueError as e:
+    print(e) # corrupt at line 1
+os.remove(journal_file + '.log')
+with JournaledContactsDB(journal_file) as journal_db:
+    ctdb.add_contact(journal_db, dummy2_contact)
+    ctdb.add_contact(journal_db, dummy2_contact)
+    journal_db.compact()
+with open(journal_file + '.csv') as snapshot:
+    snapshot_text = snapshot.read()
+with open(journal_file + '.csv', 'w') as snapshot: # cut off in the middle of the last row
+    snapshot.write(snapshot_text[:-20])
+try:
+    JournaledContactsDB(journal_file)
+except ValueError as e:
+    print(e) # line 3: expected 13 columns
+with open(journal_file + '.csv') as snapshot:
+    print(snapshot.read() == snapshot_text[:-20]) # True, the snapshot was left alone
+# END JOURNAL TEST
+
+print('\n\n\n')
+
+# SNAPSHOT TEST
+snapshot_file = os.path.join(tempfile.mkdtemp(), 'contacts.snap')
+save_contacts_snapshot(contact_db, snapshot_file)
+with load_contacts_snapshot(snapshot_file) as snapshot_db:
+    print(dict(snapshot_db) == contact_db) # True
+    print(snapshot_db.items() == contact_db.items()) # True, a real items view
+    ctdb.update_contact(snapshot_db, id1, {'notes': 'from the snapshot'})
+    ctdb.delete_contact(snapshot_db, dummy2_id)
+    snapshot_id = ctdb.add_contact(snapshot_db, dummy1_contact)
+    print((snapshot_id, snapshot_db[snapshot_id]) in snapshot_db.items(), len(snapshot_db.items()) == len(contact_db)) # True True
+    snapshot_copy = dict(snapshot_db.items())
+    save_contacts_snapshot(snapshot_db, snapshot_file + '2')
+with load_contacts_snapshot(snapshot_file + '2') as snapshot_db:
+    print(dict(snapshot_db) == snapshot_copy) # True, changes survive a second snapshot
+    print(snapshot_db[id1]['notes']) # from the snapshot
+# END SNAPSHOT TEST
+
+print('\n\n\n')
+
+# METRICS TEST
+contact_metrics.metrics.reset()
+contact_metrics.enable()
+ctdb.fuzzy_search_contacts_by_name(contact_db, 'jo') # too short for trigrams, falls back to search_contacts_by_name
+ctdb.search_contacts_by_name(contact_db, 'john')
+contact_metrics.disable()
+recorded = contact_metrics.metrics.to_dict()
+print({operation: stats['count'] for operation, stats in recorded.items()}) # fuzzy once, search by name once (the fallback isn't counted)
+print(contact_metrics.is_enabled()) # False
+# END METRICS TEST
+
+print('\n\n\n')
+
+# DEDUP TEST
+dedup_db = {}
+dedup_id1 = ctdb.add_contact(dedup_db, ctdb.complete_partial({'first_name': 'Jo Ann', 'last_name': "O'Neil", 'phone': '555-200-0001'}))
+dedup_id2 = ctdb.add_contact(dedup_db, ctdb.complete_partial({'first_name': 'Joann', 'last_name': 'ONeil', 'phone': '555-200-0001', 'email': 'joann@email.com'}))
+dedup_id3 = ctdb.add_contact(dedup_db, ctdb.complete_partial({'first_name': 'Someone', 'last_name': 'Else', 'phone': '555-200-0003'}))
+print(find_duplicate_clusters(dedup_db) == [[dedup_id1, dedup_id2]]) # True
+merged_id = merge_cluster(dedup_db, [dedup_id1, dedup_id2])
+print(dedup_db[merged_id]['email'], len(dedup_db)) # joann@email.com 2
+single_contact = dedup_db[dedup_id3]
+single_id = merge_cluster(dedup_db, [dedup_id3])
+print(dedup_db[single_id] is not single_contact, dedup_db[single_id]['phone'] == single_contact['phone']) # True True, a copy and not the stored contact
+ctdb.add_contact(dedup_db, ctdb.complete_partial({'first_name': 'Other', 'last_name': 'Person', 'phone': '555-200-0003'}))
+print(find_duplicate_clusters(dedup_db)) # [], same phone but different names
+# END DEDUP TEST
+
+print('\n\n\n')
+
+# LOADER TEST
+loader_file = os.path.join(tempfile.mkdtemp(), 'loader.csv')
+ctdb.write_contacts_csv(contact_db, loader_file)
+print([len(batch) for batch in ctdb.iter_contact_batches(loader_file, batch_size=2)]) # batches of 2, the last one may be smaller
+loaded_batches = []
+batch_loaded_db = ctdb.load_contacts_from_file(loader_file, IndexedContactsDB(), batch_size=2, on_batch=loaded_batches.append)
+print(dict(batch_loaded_db) == contact_db, len(loaded_batches) == (len(contact_db) + 1) // 2) # True True
+print(ctdb.load_contacts_parallel(loader_file, workers=2) == contact_db) # True, same contacts in the same order
+print(list(ctdb.load_contacts_parallel(loader_file, workers=2)) == list(contact_db)) # True
+print(ctdb.load_contacts_parallel('no_such_file', workers=2)) # {}
+unicode_db = {'contact_zoe': ctdb.complete_partial({'first_name': 'Zoë', 'last_name': 'Núñez', 'phone': '555-300-0001', 'notes': 'line\u2028separator'})}
+ctdb.write_contacts_csv(unicode_db, loader_file)
+print(ctdb.load_contacts_parallel(loader_file, workers=2) == unicode_db == ctdb.load_contacts_from_file(loader_file)) # True, str.splitlines would split the notes
+# END LOADER TEST
+
+print('\n\n\n')
+
+# QUERY TEST
+query_db = IndexedContactsDB(contact_db)
+print(query(query_db, category='personal') == query(contact_db, category='personal')) # True, indexes give the same result
+print(query(query_db, category='personal', name_prefix='dum') == ctdb.search_contacts_by_name(contact_db, 'dummy')) # True
+print(list(query(query_db, limit=2)) + list(query(query_db, limit=2, offset=2)) == list(query_db)[:4]) # True, pages follow database order
+print(query(query_db, city='Anytown', name='no such name')) # {}
+try:
+    query(query_db, favourite_color='blue')
+except ValueError as e:
+    print(e) # unknown query filter
+# END QUERY TEST
+
+print('\n\n\n')
+
+# SHARD TEST
+shard_base = os.path.join(tempfile.mkdtemp(), 'sharded')
+with ShardedContactsDB(shard_base, num_shards=3) as sharded_db:
+    sharded_ids = [ctdb.add_contact(sharded_db, contact) for contact in contact_db.values()]
+    print(all(sharded_db._call(shard_for(contact_id, 3), 'contains', contact_id) for contact_id in sharded_ids)) # True, each contact is on its own shard
+    print(sum(sharded_db._call(shard, 'len') for shard in range(3)) == len(sharded_db) == len(contact_db)) # True, and only there
+    print(len(ctdb.search_contacts_by_name(sharded_db, 'dummy')) == len(ctdb.search_contacts_by_name(contact_db, 'dummy'))) # True
+    print(list(query(sharded_db, limit=2, offset=1)) == sorted(sharded_ids)[1:3]) # True, pages come in ID order
+with ShardedContactsDB(shard_base, num_shards=3) as sharded_db:
+    print(sorted(sharded_db) == sorted(sharded_ids)) # True, reopened from the shard files
+try:
+    ShardedContactsDB(shard_base, num_shards=2)
+except ValueError as e:
+    print(e) # created with 3 shards, not 2
+sharded_db = ShardedContactsDB(shard_base, num_shards=3)
+sharded_db._processes[1].kill()
+sharded_db._processes[1].join()
+try:
+    len(sharded_db)
+except RuntimeError as e:
+    print(e) # shard 1: worker process exited
+print(sharded_db._call(0, 'len') == sum(shard_for(contact_id, 3) == 0 for contact_id in sharded_ids)) # True, the other shards still answer
+try:
+    sharded_db.close()
+except RuntimeError as e:
+    print(e, sharded_db._processes == []) # shard 1: worker process exited True, the rest are closed anyway
+with open(shard_base + '_shard2.log', 'w') as log_file:
+    log_file.write('not json\nnot json\n')
+try:
+    ShardedContactsDB(shard_base, num_shards=3)
+except RuntimeError as e:
+    print(str(e).startswith('shard 2: ValueError')) # True, reported when opening
+# END SHARD TEST
@@ -1,4 +1,17 @@
+import functools
+import itertools
+import multiprocessing
 import re
+import sys
+import time
+from collections import Counter
+
+try:
+    import numpy as np
+except ImportError: # validate_many returns lists instead
+    np = None
+
+
 def format_receipt(items: list[str], prices: list[float], quantities: list[int]) -> str:
     """
     Create a formatted receipt using string methods.
@@ -32,15 +45,77 @@ def format_receipt(items: list[str], prices: list[float], quantities: list[int])
         TOTAL $ 21.99
         ========================================
     """
-    receipt_str = '=' * 40 + '\n'
-    receipt_str += 'Item Qty Price\n'
-    receipt_str += '=' * 40 + '\n'
-    receipt_str += '\n'.join(f'{item} {quantity} ${price:.2f}' for item, price, quantity in zip(items, prices, quantities)) + '\n'
-    receipt_str += '=' * 40 + '\n'
-    receipt_str += f'TOTAL ${sum(prices):.2f}\n'
-    receipt_str += '=' * 40
+    rule = '=' * 40
+    lines = [rule, 'Item Qty Price', rule]
+    lines += [f'{item} {quantity} ${price:.2f}' for item, price, quantity in zip(items, prices, quantities)] or [''] # blank line if there are no items
+    lines += [rule, f'TOTAL ${sum(prices):.2f}', rule]
     
-    return receipt_str
+    return '\n'.join(lines) # one join instead of growing a string
+
+
+class ReceiptLayout:
+    """
+    Fixed-width receipt columns: item left-aligned (cut to fit), quantity centered,
+    amount right-aligned with 2 decimals. The format strings are built once per layout.
+    """
+    
+    def __init__(self, item_width: int = 20, quantity_width: int = 5, price_width: int = 8, rule_width: int = 40):
+        self.rule = '=' * rule_width + '\n'
+        self.header = f'{"Item":<{item_width}}{"Qty":^{quantity_width}}{"Price":>{price_width + 1}}\n'
+        self.row_format = f'{{:<{item_width}.{item_width}}}{{:^{quantity_width}}}${{:>{price_width}.2f}}\n'
+        self.total_format = f'{{:<{item_width + quantity_width}}}${{:>{price_width}.2f}}\n'
+
+
+DEFAULT_RECEIPT_LAYOUT = ReceiptLayout()
+
+
+class ReceiptWriter:
+    """
+    Writes a receipt to any file-like object line by line, so a receipt with any
+    number of items never has to be in memory at once. Amounts are price * quantity
+    and the totals are kept as the items are added (in cents, so they don't drift).
+    """
+    
+    def __init__(self, file, layout: ReceiptLayout = DEFAULT_RECEIPT_LAYOUT):
+        self.file = file
+        self.layout = layout
+        self.item_count = 0
+        self.quantity = 0
+        self.total_cents = 0
+        file.write(layout.rule + layout.header + layout.rule)
+    
+    def add_item(self, item: str, price: float, quantity: int):
+        cents = round(price * quantity * 100)
+        self.item_count += 1
+        self.quantity += quantity
+        self.total_cents += cents
+        self.file.write(self.layout.row_format.format(item, quantity, cents / 100))
+    
+    def add_items(self, items, prices, quantities):
+        """
+        Add items from three parallel iterables (lists or generators).
+        """
+        for item, price, quantity in zip(items, prices, quantities):
+            self.add_item(item, price, quantity)
+    
+    def finish(self) -> dict:
+        """
+        Write the total, returns {'items', 'quantity', 'total'}.
+        """
+        self.file.write(self.layout.rule + self.layout.total_format.format('TOTAL', self.total_cents / 100) + self.layout.rule)
+        return {'items': self.item_count, 'quantity': self.quantity, 'total': self.total_cents / 100}
+
+
+def write_receipt(file, items, prices, quantities, layout: ReceiptLayout = DEFAULT_RECEIPT_LAYOUT) -> dict:
+    """
+    Stream a whole receipt to file, see ReceiptWriter.
+    
+    Returns:
+        dict: {'items', 'quantity', 'total'}
+    """
+    receipt = ReceiptWriter(file, layout)
+    receipt.add_items(items, prices, quantities)
+    return receipt.finish()
 
 
 def process_user_data(raw_data: dict[str, str]) -> dict[str, str]:
@@ -109,6 +184,8 @@ def process_user_data(raw_data: dict[str, str]) -> dict[str, str]:
 def analyze_text(text: str) -> dict:
     """
     Perform comprehensive text analysis using string methods.
+    Single pass over the text, see TextAnalyzer (analyze_file and analyze_chunks
+    do the same for text that doesn't fit in memory).
     Args:
     text: Multi-line string of text
     Returns:
@@ -116,8 +193,8 @@ def analyze_text(text: str) -> dict:
     - 'total_chars': Total character count
     - 'total_words': Total word count
     - 'total_lines': Number of lines
-    - 'avg_word_length': Average word length (rounded to 2 decimal)
-    - 'most_common_word': Most frequently used word (case-insensitive)
+    - 'avg_word_length': Average word length (rounded to 2 decimal), 0 if there are no words
+    - 'most_common_word': Most frequently used word (case-insensitive), the first one on ties, None if there are no words
     - 'longest_line': The longest line in the text
     - 'words_per_line': List of word counts per line
     - 'capitalized_sentences': Number of sentences starting with capital
@@ -132,32 +209,242 @@ def analyze_text(text: str) -> dict:
     >>> result['questions']
     1
     """
-    words = [word.lower() for word in re.findall(r'\w+', text)]
-    analysis = {
-        'total_chars': len(text), # including whitespace
-        'total_words': len(words),
-        'total_lines': text.count('\n') + 1
-    } # initialize with easy to calculate
-    analysis['avg_word_length'] = round(len(''.join(words)) / analysis['total_words'], 2) # num of chars in words / num of words
-    analysis['most_common_word'] = max(words, key = lambda x: words.count(x))
-    analysis['longest_line'] = max(text.split('\n'), key=len)
-    analysis['words_per_line'] = [len(re.findall(r'\w+', line)) for line in text.split('\n')]
-    
-    analysis['capitalized_sentences'] = 0
-    analysis['questions'] = 0
-    analysis['exclamations'] = 0
-    
-    sentence_pattern = r'\w[^.!?]*[.!?]' # at least one 'word' char
-    for sentence_match in re.finditer(sentence_pattern, text):
-        sentence = sentence_match.group().strip()
-        if sentence and sentence[0].isupper():
-            analysis['capitalized_sentences'] += 1
-        if sentence.endswith('?'):
-            analysis['questions'] += 1
-        elif sentence.endswith('!'):
-            analysis['exclamations'] += 1
+    return TextAnalyzer().feed(text).result()
+
+
+def analyze_chunks(chunks) -> dict:
+    """
+    analyze_text for text given as an iterable of string chunks of any size,
+    chunks don't have to end on a line or word boundary.
+    """
+    analyzer = TextAnalyzer().feed('') # no chunks (an empty file) is one empty line, like analyze_text('')
+    for chunk in chunks:
+        analyzer.feed(chunk)
+    return analyzer.result()
+
+
+def analyze_file(filename: str, chunk_size: int = 1 << 20, encoding: str = 'utf-8') -> dict:
+    """
+    analyze_text for a text file, read chunk_size characters at a time.
+    """
+    with open(filename, encoding=encoding) as text_file:
+        return analyze_chunks(iter(lambda: text_file.read(chunk_size), ''))
+
+
+WORD_PATTERN = re.compile(r'\w+')
+SENTENCE_START_PATTERN = re.compile(r'\w') # sentences start at a word char and end at the next . ! or ?
+SENTENCE_END_PATTERN = re.compile(r'[.!?]')
+
+
+class TextAnalyzer:
+    """
+    Streaming text analysis: feed() the text in pieces, result() gives the analyze_text dict.
+    Lines are split off as they complete and every line is scanned once for words
+    (counted in a Counter) and once for sentence boundaries. A sentence can run over
+    several lines and chunks, so whether it started capitalized is kept between them.
+    """
+    
+    def __init__(self):
+        self.total_chars = 0
+        self.total_words = 0
+        self.word_chars = 0
+        self.word_counts = Counter() # lowercase word -> count, in order of first use
+        self.longest_line = None
+        self.words_per_line = []
+        self.capitalized_sentences = 0
+        self.questions = 0
+        self.exclamations = 0
+        self._line_parts = [] # start of the line that's still being fed
+        self._in_sentence = False
+        self._sentence_capitalized = False
+        self._fed = False # an analyzer that never got any text (like a merge target) has no lines at all
+        self._finished = False
+    
+    def feed(self, chunk: str):
+        if self._finished:
+            raise ValueError('cannot feed text after result()')
+        self._fed = True
+        self.total_chars += len(chunk)
+        lines = chunk.split('\n')
+        if len(lines) > 1:
+            self._line_parts.append(lines[0])
+            self._add_line(''.join(self._line_parts))
+            for line in lines[1:-1]:
+                self._add_line(line)
+            self._line_parts = []
+        self._line_parts.append(lines[-1])
+        return self
+    
+    def _add_line(self, line: str):
+        if line.isascii(): # lowercasing first is the same then, and faster
+            words = WORD_PATTERN.findall(line.lower())
+        else:
+            words = [word.lower() for word in WORD_PATTERN.findall(line)]
+        self.words_per_line.append(len(words))
+        if words:
+            self.total_words += len(words)
+            self.word_chars += sum(map(len, words))
+            self.word_counts.update(words)
+        if self.longest_line is None or len(line) > len(self.longest_line): # first longest line wins
+            self.longest_line = line
         
-    return analysis
+        position = 0
+        while True:
+            if not self._in_sentence:
+                match = SENTENCE_START_PATTERN.search(line, position)
+                if match is None:
+                    break
+                self._in_sentence = True
+                self._sentence_capitalized = match.group().isupper()
+                position = match.end()
+            match = SENTENCE_END_PATTERN.search(line, position)
+            if match is None: # sentence goes on in the next line
+                break
+            self._in_sentence = False
+            self.capitalized_sentences += self._sentence_capitalized
+            if match.group() == '?':
+                self.questions += 1
+            elif match.group() == '!':
+                self.exclamations += 1
+            position = match.end()
+    
+    def _finish(self):
+        if not self._finished:
+            if self._fed:
+                self._add_line(''.join(self._line_parts)) # text after the last newline is the last line, even if empty
+            self._line_parts = []
+            self._finished = True
+    
+    def merge(self, other: 'TextAnalyzer'):
+        """
+        Add the totals of another analyzer (e.g. the next document) to this one.
+        The texts stay separate, lines and sentences don't run from one into the other,
+        and ties keep going to whichever text came first.
+        """
+        self._finish()
+        other._finish()
+        self.total_chars += other.total_chars
+        self.total_words += other.total_words
+        self.word_chars += other.word_chars
+        self.word_counts.update(other.word_counts) # new words are added after the ones already seen
+        if self.longest_line is None or other.longest_line is not None and len(other.longest_line) > len(self.longest_line):
+            self.longest_line = other.longest_line
+        self.words_per_line.extend(other.words_per_line)
+        self.capitalized_sentences += other.capitalized_sentences
+        self.questions += other.questions
+        self.exclamations += other.exclamations
+        return self
+    
+    def result(self) -> dict:
+        self._finish()
+        return {
+            'total_chars': self.total_chars, # including whitespace
+            'total_words': self.total_words,
+            'total_lines': len(self.words_per_line),
+            'avg_word_length': round(self.word_chars / self.total_words, 2) if self.total_words else 0,
+            'most_common_word': self.word_counts.most_common(1)[0][0] if self.word_counts else None,
+            'longest_line': self.longest_line,
+            'words_per_line': self.words_per_line,
+            'capitalized_sentences': self.capitalized_sentences,
+            'questions': self.questions,
+            'exclamations': self.exclamations,
+        }
+
+
+def _analyze_shard(documents: list[str], per_document: bool) -> tuple:
+    # runs in a worker process, sends back one merged analyzer per shard instead of one per document
+    shard = TextAnalyzer()
+    document_results = [] if per_document else None
+    for document in documents:
+        analyzer = TextAnalyzer().feed(document)
+        if per_document:
+            document_results.append(analyzer.result())
+        shard.merge(analyzer)
+    return shard, document_results
+
+
+def _shards(documents, shard_size: int):
+    documents = iter(documents)
+    while shard := list(itertools.islice(documents, shard_size)):
+        yield shard
+
+
+def analyze_corpus(documents, workers: int = 4, shard_size: int = 256, per_document: bool = False):
+    """
+    analyze_text over many documents at once, spread over a process pool.
+    Documents are sent to the workers in shards of shard_size, each worker merges the
+    results of its shard and the shards are merged back in order, so the result is the
+    same for any number of workers.
+    
+    Args:
+        documents: Iterable of document strings (read lazily)
+        workers: Number of processes, 1 runs everything in this process
+        shard_size: Documents per shard
+        per_document: Also return the analyze_text result of every document
+    
+    Returns:
+        dict: Combined analysis of the corpus with the same keys as analyze_text
+        (words_per_line has every document's lines in order), or with per_document
+        a tuple (combined analysis, list of per document results)
+    """
+    corpus = TextAnalyzer()
+    document_results = []
+    if workers == 1:
+        shard_results = (_analyze_shard(shard, per_document) for shard in _shards(documents, shard_size))
+        for shard, shard_documents in shard_results:
+            corpus.merge(shard)
+            document_results += shard_documents or []
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            for shard, shard_documents in pool.imap(functools.partial(_analyze_shard, per_document=per_document), _shards(documents, shard_size)):
+                corpus.merge(shard)
+                document_results += shard_documents or []
+    
+    if per_document:
+        return corpus.result(), document_results
+    return corpus.result()
+
+
+def analyze_corpus_files(filenames, workers: int = 4, shard_size: int = 256, encoding: str = 'utf-8') -> dict:
+    """
+    analyze_corpus for a list of text files, one document per file.
+    """
+    def read_documents():
+        for filename in filenames:
+            with open(filename, encoding=encoding) as text_file:
+                yield text_file.read()
+    return analyze_corpus(read_documents(), workers, shard_size)
+
+
+def benchmark_corpus(documents: list[str], worker_counts=(1, 4, 16), shard_size: int = 256) -> list[dict]:
+    """
+    Time analyze_corpus on the same documents with each number of workers.
+    
+    Returns:
+        list: {'workers', 'seconds', 'documents_per_second', 'mb_per_second'} per worker count
+    """
+    megabytes = sum(map(len, documents)) / 2**20
+    timings = []
+    for workers in worker_counts:
+        start = time.perf_counter()
+        analyze_corpus(documents, workers, shard_size)
+        seconds = time.perf_counter() - start
+        timings.append({
+            'workers': workers,
+            'seconds': round(seconds, 3),
+            'documents_per_second': round(len(documents) / seconds, 1),
+            'mb_per_second': round(megabytes / seconds, 2),
+        })
+    return timings
+
+FIND_PATTERNS = {
+    'integers': re.compile(r'\b(?<!\.)\d+(?!\.)\b'), # uses negative look ahead/behind to make sure its not part of a decimal
+    'decimals': re.compile(r'\b\d+.\d+\b'),
+    'words_with_digits': re.compile(r'\b\w*\d\w*\b'),
+    'capitalized_words': re.compile(r'\b[A-Z]\w*\b'),
+    'all_caps_words': re.compile(r'\b[A-Z]{2,}\b'), # only capture all caps if they are 2+ chars (so single letter words like'I' aren't grabbed)
+    'repeated_chars': re.compile(r'(.)\1')
+}
 
 
 def find_patterns(text):
@@ -188,18 +475,7 @@ def find_patterns(text):
         ['W0RLD']
     """
     
-    patterns = {
-        'integers': r'\b(?<!\.)\d+(?!\.)\b', # uses negative look ahead/behind to make sure its not part of a decimal
-        'decimals': r'\b\d+.\d+\b',
-        'words_with_digits': r'\b\w*\d\w*\b',
-        'capitalized_words': r'\b[A-Z]\w*\b',
-        'all_caps_words': r'\b[A-Z]{2,}\b', # only capture all caps if they are 2+ chars (so single letter words like'I' aren't grabbed)
-        'repeated_chars': r'(.)\1'
-    }
-    
-    result = {}
-    for key, pattern in patterns.items():
-        result[key] = re.findall(pattern, text)
+    result = {key: pattern.findall(text) for key, pattern in FIND_PATTERNS.items()}
     
     # remove entries that are just numbers (easier than figuring out complicated regex stuff)
     result['words_with_digits'] = [word for word in result['words_with_digits'] if not word.isdecimal()]
@@ -207,6 +483,71 @@ def find_patterns(text):
     return result
 
 
+def find_patterns_stream(chunks) -> dict:
+    """
+    find_patterns for text given as an iterable of chunks (split anywhere).
+    None of the patterns match across a newline, so the chunks are regrouped into
+    blocks of whole lines and each block is scanned as it comes.
+    """
+    result = {key: [] for key in FIND_PATTERNS}
+    for block in _line_blocks(chunks):
+        for key, pattern in FIND_PATTERNS.items():
+            result[key] += pattern.findall(block)
+    result['words_with_digits'] = [word for word in result['words_with_digits'] if not word.isdecimal()]
+    return result
+
+
+def _line_blocks(chunks):
+    # the text of chunks again, but cut only after newlines (the last block can be a partial line)
+    parts = []
+    for chunk in chunks:
+        cut = chunk.rfind('\n') + 1
+        if cut:
+            parts.append(chunk[:cut])
+            yield ''.join(parts)
+            parts = []
+            chunk = chunk[cut:]
+        parts.append(chunk)
+    yield ''.join(parts)
+
+
+def _named_parts(*names):
+    # extractor that names the match groups in order
+    def extract_parts(match):
+        return dict(zip(names, match.groups()))
+    return extract_parts
+
+
+def _time_parts(match):
+    if match.group(4): # 24-hour format
+        return {'hour': match.group(4), 'minute': match.group(5), 'period': '24-hour'}
+    # 12-hour format
+    return {'hour': match.group(1), 'minute': match.group(2), 'period': match.group(3).strip() if match.group(3) else None}
+
+
+def _url_parts(match):
+    return {'domain': match.group(1), 'path': match.group(2) if match.group(2) else ''}
+
+
+# format_type -> (compiled pattern, extractor that turns a match into the parts dict), groups are the parts
+FORMAT_VALIDATORS = {
+    'phone': (re.compile(r'^\(?(\d{3})\)?[-\s](\d{3})-(\d{4})$'), _named_parts('area_code', 'prefix', 'line')),
+    'date': (re.compile(r'^(0[1-9]|1[0-2])/(0[1-9]|[1-2][0-9]|3[0-1])/(\d{4})$'), _named_parts('month', 'day', 'year')),
+    'time': (re.compile(r'^(0[1-9]|1[0-2]):([0-5][0-9])( AM| PM)?|([0-1][0-9]|2[0-3]):([0-5][0-9])$'), _time_parts), # odd one
+    'email': (re.compile(r'^([a-z0-9._%+-]+)@([a-z0-9.-]+)\.([a-z]+)$'), _named_parts('username', 'domain', 'extension')),
+    'url': (re.compile(r'^https?://(?:www.)?(\w*\.[a-zA-Z]*)/?([\w/]*)?$'), _url_parts),
+    'ssn': (re.compile(r'^(\d{3})-(\d{2})-(\d{4})$'), _named_parts('group1', 'group2', 'group3')),
+}
+
+
+def register_format(format_type: str, pattern: str, extract_parts):
+    """
+    Add (or replace) a format for validate_format and validate_many.
+    extract_parts(match) returns the parts dict of a valid string.
+    """
+    FORMAT_VALIDATORS[format_type] = (re.compile(pattern), extract_parts)
+
+
 def validate_format(input_string, format_type):
     """
     Validate if input matches specified format using regex.
@@ -234,68 +575,60 @@ def validate_format(input_string, format_type):
         >>> validate_format("13/45/2024", "date")
         (False, None)
     """
-    # Define patterns for each format type, use groups for parts
-    patterns = {
-        'phone': r'^\(?(\d{3})\)?[-\s](\d{3})-(\d{4})$',
-        'date': r'^(0[1-9]|1[0-2])/(0[1-9]|[1-2][0-9]|3[0-1])/(\d{4})$',
-        'time': r'^(0[1-9]|1[0-2]):([0-5][0-9])( AM| PM)?|([0-1][0-9]|2[0-3]):([0-5][0-9])$', # odd one
-        'email': r'^([a-z0-9._%+-]+)@([a-z0-9.-]+)\.([a-z]+)$',
-        'url': r'^https?://(?:www.)?(\w*\.[a-zA-Z]*)/?([\w/]*)?$',
-        'ssn': r'^(\d{3})-(\d{2})-(\d{4})$'
-    }
-    extracted_parts = None
+    if format_type not in FORMAT_VALIDATORS:
+        raise ValueError("Invalid format_type specified.")
+    
+    pattern, extract_parts = FORMAT_VALIDATORS[format_type]
+    match = pattern.match(input_string)
+    if match:
+        return True, extract_parts(match)
+    return False, None
+
 
-    if format_type not in patterns:
+def validate_many(strings, format_type: str) -> tuple:
+    """
+    validate_format for a whole batch of strings (a list or a NumPy string array).
+    Every distinct string is only matched once, batches from ingestion repeat a lot.
+    
+    Returns:
+        tuple: (flags, parts) where flags[i] is whether strings[i] is valid (a NumPy bool
+        array if NumPy is installed, else a list) and parts[i] is its extracted parts dict or None
+    """
+    if format_type not in FORMAT_VALIDATORS:
         raise ValueError("Invalid format_type specified.")
+    pattern, extract_parts = FORMAT_VALIDATORS[format_type]
+    
+    def check(string):
+        match = pattern.match(string)
+        return (True, extract_parts(match)) if match else (False, None)
+    
+    if np is not None and isinstance(strings, np.ndarray):
+        strings = strings.tolist() # python strs, faster to hash and match than numpy scalars
+    
+    checked = {} # string -> (is_valid, parts)
+    flags = []
+    parts = []
+    for string in strings:
+        result = checked.get(string)
+        if result is None:
+            result = checked[string] = check(string)
+            parts.append(result[1])
+        else: # repeats get their own copy of the parts
+            parts.append(dict(result[1]) if result[1] else None)
+        flags.append(result[0])
+    
+    if np is not None:
+        flags = np.array(flags, dtype=bool)
+    return flags, parts
 
-    match = re.match(patterns[format_type], input_string)
-    is_valid = bool(match)
-
-    if is_valid:
-        if format_type == 'phone':
-            extracted_parts = {
-                'area_code': match.group(1),
-                'prefix': match.group(2),
-                'line': match.group(3)
-            }
-        elif format_type == 'date':
-            extracted_parts = {
-                'month': match.group(1),
-                'day': match.group(2),
-                'year': match.group(3)
-            }
-        elif format_type == 'time':
-            if match.group(4): # 24-hour format
-                extracted_parts = {
-                    'hour': match.group(4),
-                    'minute': match.group(5),
-                    'period': '24-hour' 
-                }
-            else: # 12-hour format
-                extracted_parts = {
-                    'hour': match.group(1),
-                    'minute': match.group(2),
-                    'period': match.group(3).strip() if match.group(3) else None
-                }
-        elif format_type == 'email':
-            extracted_parts = {
-                'username': match.group(1),
-                'domain': match.group(2),
-                'extension': match.group(3)
-            }
-        elif format_type == 'url':
-            extracted_parts = {
-                'domain': match.group(1),
-                'path': match.group(2) if match.group(2) else ''
-            }
-        elif format_type == 'ssn':
-            extracted_parts = {
-                'group1': match.group(1),
-                'group2': match.group(2),
-                'group3': match.group(3)
-            }
-
-    return is_valid, extracted_parts
+
+EXTRACT_PATTERNS = {
+    'prices': re.compile(r'\$(?:\d{1,3},)*\d{1,3}\.\d{2}'),
+    'percentages': re.compile(r'\d{1,2}(?:\.\d{0,2})?%'), # up to 2 digits after the decimal of a percent
+    'years': re.compile(r'(?:19|20)[0-9][0-9]'),
+}
+SENTENCE_PATTERN = re.compile(r'\w[^.!?]*[.!?]')
+QUOTED_PATTERN = re.compile(r'"(.*)"')
 
 
 def extract_information(text: str):
@@ -324,21 +657,48 @@ def extract_information(text: str):
         >>> result['quoted_text']
         ['Great deal!']
     """
-    # Your code here
-    patterns = {
-        'prices': r'\$(?:\d{1,3},)*\d{1,3}\.\d{2}',
-        'percentages': r'\d{1,2}(?:\.\d{0,2})?%', # up to 2 digits after the decimal of a percent
-        'years': r'(?:19|20)[0-9][0-9]',
-        'sentences': r'\w[^.!?]*[.!?]',
-        'questions': r'\w[^.!?]*\?',
-        'quoted_text': r'"(.*)"'
-    }
-    
-    result = {}
-    for key, pattern in patterns.items():
-        result[key] = re.findall(pattern, text)
+    result = {key: pattern.findall(text) for key, pattern in EXTRACT_PATTERNS.items()}
+    result['sentences'] = SENTENCE_PATTERN.findall(text)
+    # a question is a sentence ending with ?, same as matching r'\w[^.!?]*\?' on its own
+    result['questions'] = [sentence for sentence in result['sentences'] if sentence[-1] == '?']
+    result['quoted_text'] = QUOTED_PATTERN.findall(text)
     
     return result
+
+
+def extract_information_stream(chunks) -> dict:
+    """
+    extract_information for text given as an iterable of chunks (split anywhere).
+    Everything but sentences stays within one line, so it is scanned in blocks of whole
+    lines. A sentence can go on over several lines and chunks, its start is kept until
+    its end shows up.
+    """
+    result = {key: [] for key in EXTRACT_PATTERNS}
+    result['sentences'] = []
+    quoted_text = []
+    sentence_parts = [] # start of a sentence that hasn't ended yet
+    for block in _line_blocks(chunks):
+        for key, pattern in EXTRACT_PATTERNS.items():
+            result[key] += pattern.findall(block)
+        quoted_text += QUOTED_PATTERN.findall(block)
+        
+        if not SENTENCE_END_PATTERN.search(block): # no sentence can end in this block
+            if sentence_parts:
+                sentence_parts.append(block)
+            elif match := SENTENCE_START_PATTERN.search(block):
+                sentence_parts.append(block[match.start():])
+            continue
+        text = ''.join(sentence_parts) + block
+        end = 0
+        for match in SENTENCE_PATTERN.finditer(text):
+            result['sentences'].append(match.group())
+            end = match.end()
+        match = SENTENCE_START_PATTERN.search(text, end) # can't have an end after it, or it would have matched
+        sentence_parts = [text[match.start():]] if match else []
+    
+    result['questions'] = [sentence for sentence in result['sentences'] if sentence[-1] == '?']
+    result['quoted_text'] = quoted_text
+    return result
     
 
 
@@ -348,6 +708,7 @@ if __name__ == '__main__':
     prices = [3.50, 8.99, 2.00]
     quantities = [2, 1, 3]
     print(format_receipt(items, prices, quantities))
+    write_receipt(sys.stdout, items, prices, quantities) # fixed-width columns, total counts quantities
     
     raw_data = {
         'name': ' john DOE ',
@@ -375,11 +736,15 @@ if __name__ == '__main__':
     analysis_result = analyze_text(text)
     print("\nText Analysis:")
     print(analysis_result)
+    print(analyze_chunks([text[:10], text[10:33], text[33:]]) == analysis_result) # True, chunks can split words and lines
+    print(analyze_chunks([]) == analyze_text('')) # True, 1 empty line
+    print(analyze_corpus([text, text.upper(), 'One more document?'], workers=2)['total_words']) # 18 + 18 + 3 = 39
     
     text_patterns = "I have 25 apples and 3.14 pies. HELLO W0RLD! The quick brown fox jumps over the lazy dog. Mississippi has repeated characters."
     patterns_result = find_patterns(text_patterns)
     print("\nPattern Finding:")
     print(patterns_result)
+    print(find_patterns_stream([text_patterns[:30], text_patterns[30:]]) == patterns_result) # True
     
     print("\nValidation Examples:")
     print(validate_format("(555) 123-4567", "phone"))
@@ -396,6 +761,7 @@ if __name__ == '__main__':
     print(validate_format("ftp://example.com", "url")) # Should be False
     print(validate_format("123-45-6789", "ssn"))
     print(validate_format("123456789", "ssn")) # Should be False
+    print(validate_many(["555-123-4567", "5551234567", "555-123-4567"], "phone")) # flags [True, False, True] and parts
     
     infomercial_text = """This amazing product can be yours for just $19.99! That's 50% off the regular price.
 But wait, there's more! If you order before 12/31/2024, we'll include a second one FREE.
@@ -405,4 +771,5 @@ Are you ready to change your life? Yes!
 """
     extracted_info = extract_information(infomercial_text)
     print("\nExtracted Information:")
-    print(extracted_info)
\ No newline at end of file
+    print(extracted_info)
+    print(extract_information_stream(infomercial_text[i:i + 50] for i in range(0, len(infomercial_text), 50)) == extracted_info) # True
\ No newline at end of file